@@ -6,7 +6,8 @@ from app.database.data_classes.ssa_models import (
     UserAgent,
     AgentDetails,
     ToolDetails,
-    SnowflakeCortexLLM
+    SnowflakeCortexLLM,
+    UserSession
 )
 
 from app.database.data_classes.lsa_models import (
@@ -24,6 +25,7 @@ __all__ = [
     "AgentDetails",
     "ToolDetails",
     "SnowflakeCortexLLM",
+    "UserSession",
     # LangGraph Database Models
     "LLMProvider",
     "LLMModel",
@@ -0,0 +1,159 @@
+"""
+On-disk layout of agent folders under SSA_AGENTS_DIR.
+
+Agents live in a two-level hash-sharded tree so no directory grows past a few hundred
+entries:
+
+    SSA_AGENTS_DIR/<h[0:2]>/<h[2:4]>/<agent_uuid>      h = sha1(agent_uuid)
+
+Folders from the old flat layout (SSA_AGENTS_DIR/<agent_uuid>) are still found, and
+`python -m app.utils.agent_paths migrate` moves them into their shards. Resolved paths
+are kept in a per-process index, so a repeat lookup costs one isdir on the known folder
+instead of probing every candidate. Other workers can move or delete a folder, so a hit
+whose folder is gone is dropped and looked up again.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from app.config import SSA_AGENTS_DIR
+
+
+def shard_path(agent_uuid: str) -> str:
+    digest = hashlib.sha1(agent_uuid.encode()).hexdigest()
+    return os.path.join(SSA_AGENTS_DIR, digest[:2], digest[2:4], agent_uuid)
+
+
+def legacy_path(agent_uuid: str) -> str:
+    return os.path.join(SSA_AGENTS_DIR, agent_uuid)
+
+
+class AgentPathIndex:
+    """
+    agent_uuid -> folder for agents known to be materialized on disk
+    """
+
+    def __init__(self):
+        self._paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, agent_uuid: str, path: str) -> str:
+        with self._lock:
+            self._paths[agent_uuid] = path
+        return path
+
+    def resolve(self, agent_uuid: str) -> Optional[str]:
+        """
+        Folder of a materialized agent, or None. An indexed folder is re-checked with
+        one isdir, since another worker may have moved (adopt / migrate) or deleted it.
+        """
+        path = self._paths.get(agent_uuid)
+        if path is not None:
+            if os.path.isdir(path):
+                return path
+            self.forget(agent_uuid)
+        for candidate in (shard_path(agent_uuid), legacy_path(agent_uuid)):
+            if os.path.isdir(candidate):
+                return self._register(agent_uuid, candidate)
+        return None
+
+    def ensure(self, agent_uuid: str) -> str:
+        """
+        Folder of an agent, creating it (with its source/ directory) in its shard if needed
+        """
+        path = self.resolve(agent_uuid)
+        if path is None:
+            path = shard_path(agent_uuid)
+            os.makedirs(os.path.join(path, "source"), exist_ok=True)
+            self._register(agent_uuid, path)
+        return path
+
+    def adopt(self, agent_uuid: str, folder: str) -> str:
+        """
+        Move a folder written at the flat location into the agent's shard, merging
+        into the shard folder when it already exists. Returns the shard folder.
+        """
+        target = shard_path(agent_uuid)
+        if os.path.abspath(folder) == os.path.abspath(target):
+            return self._register(agent_uuid, target)
+        if os.path.isdir(target):
+            shutil.copytree(folder, target, dirs_exist_ok=True)
+            shutil.rmtree(folder)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.rename(folder, target)
+        return self._register(agent_uuid, target)
+
+    def forget(self, agent_uuid: str):
+        with self._lock:
+            self._paths.pop(agent_uuid, None)
+
+
+agent_paths = AgentPathIndex()
+
+
+def resolve_agent_dir(agent_uuid: str) -> Optional[str]:
+    return agent_paths.resolve(agent_uuid)
+
+
+def agent_dir(agent_uuid: str) -> str:
+    """
+    Folder of the agent if it exists, else where it will be created
+    """
+    return agent_paths.resolve(agent_uuid) or shard_path(agent_uuid)
+
+
+def ensure_agent_dir(agent_uuid: str) -> str:
+    return agent_paths.ensure(agent_uuid)
+
+
+def adopt_agent_dir(agent_uuid: str, folder: str) -> str:
+    return agent_paths.adopt(agent_uuid, folder)
+
+
+def forget_agent_dir(agent_uuid: str):
+    agent_paths.forget(agent_uuid)
+
+
+# ---------------------------------------------------------------------
+# Migration from the flat layout
+# ---------------------------------------------------------------------
+def _is_shard_dir(name: str) -> bool:
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def migrate_flat_layout(dry_run: bool = False) -> List[str]:
+    """
+    Move every flat SSA_AGENTS_DIR/<agent_uuid> folder into its shard.
+    Returns the agent_uuids moved (or that would be moved with dry_run).
+    """
+    moved = []
+    if not os.path.isdir(SSA_AGENTS_DIR):
+        return moved
+    with os.scandir(SSA_AGENTS_DIR) as entries:
+        flat = [e.name for e in entries if e.is_dir() and not _is_shard_dir(e.name)]
+    for agent_uuid in sorted(flat):
+        if not dry_run:
+            adopt_agent_dir(agent_uuid, legacy_path(agent_uuid))
+        moved.append(agent_uuid)
+    return moved
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["migrate"]:
+        print("usage: python -m app.utils.agent_paths migrate [--dry-run]")
+        return 2
+
+    dry_run = "--dry-run" in argv
+    moved = migrate_flat_layout(dry_run=dry_run)
+    action = "Would move" if dry_run else "Moved"
+    print(f"{action} {len(moved)} agent folders into sharded layout under {SSA_AGENTS_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
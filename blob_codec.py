@@ -0,0 +1,182 @@
+"""
+Versioned compression codec for JSON blob columns
+
+Stored format: one header byte followed by the payload
+    0x01  zlib-compressed JSON
+    0x02  lzma-compressed JSON
+Rows written before the codec existed hold plain UTF-8 JSON (first byte is '{', '[', ...)
+and are read as-is, so old and new rows can live side by side.
+
+Run the backfill to compress existing rows:
+    python -m app.database.blob_codec backfill
+"""
+import os
+import sys
+import json
+import lzma
+import time
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy import LargeBinary, func, select, update, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+CODEC_ZLIB = 0x01
+CODEC_LZMA = 0x02
+
+BLOB_CODEC = os.getenv("BLOB_CODEC", "zlib").lower()
+BLOB_COMPRESS_MIN_BYTES = int(os.getenv("BLOB_COMPRESS_MIN_BYTES", "256"))
+ZLIB_LEVEL = int(os.getenv("BLOB_ZLIB_LEVEL", "6"))
+
+
+# ---------------------------------------------------------------------
+# JSON helpers
+# ---------------------------------------------------------------------
+def dumps_json(value: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes with the stdlib encoder, so every
+    deployment writes identical bytes (non-str keys and NaN included)
+    """
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads_json(data: bytes) -> Any:
+    return json.loads(data)
+
+
+# ---------------------------------------------------------------------
+# Codec
+# ---------------------------------------------------------------------
+def encode_blob(data: bytes, codec: str = BLOB_CODEC) -> bytes:
+    """
+    Compress JSON bytes. Small payloads, or any payload when codec is "none",
+    are stored as plain JSON.
+    """
+    if codec == "none" or len(data) < BLOB_COMPRESS_MIN_BYTES or is_encoded(data):
+        return data
+    if codec == "lzma":
+        return bytes([CODEC_LZMA]) + lzma.compress(data, preset=6)
+    return bytes([CODEC_ZLIB]) + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decode_blob(data: Optional[bytes]) -> Optional[bytes]:
+    """
+    Return the plain JSON bytes of a stored value
+    """
+    if not data:
+        return data
+    header = data[0]
+    if header == CODEC_ZLIB:
+        return zlib.decompress(data[1:])
+    if header == CODEC_LZMA:
+        return lzma.decompress(data[1:])
+    return bytes(data)
+
+
+def is_encoded(data: Optional[bytes]) -> bool:
+    return bool(data) and data[0] in (CODEC_ZLIB, CODEC_LZMA)
+
+
+class CompressedJSONBlob(TypeDecorator):
+    """
+    LargeBinary column that compresses on write and decompresses on read.
+    Application code keeps reading and writing plain JSON bytes.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_blob(bytes(value))
+
+    def process_result_value(self, value, dialect):
+        return decode_blob(value)
+
+
+# ---------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------
+def _blob_columns():
+    from app.database.data_classes.ssa_models import AgentDetails, ToolDetails
+    from app.database.data_classes.lsa_models import LangGraphAgentProfile, MCPTool, MemoryConfigModel
+
+    return [
+        (AgentDetails, AgentDetails.agent_id, AgentDetails.agent_json),
+        (ToolDetails, ToolDetails.id, ToolDetails.tool_json),
+        (LangGraphAgentProfile, LangGraphAgentProfile.agent_id, LangGraphAgentProfile.agent_json),
+        (MCPTool, MCPTool.id, MCPTool.mcp_tool_json),
+        (MemoryConfigModel, MemoryConfigModel.id, MemoryConfigModel.memory_config_json),
+    ]
+
+
+def backfill(db, batch_size: int = 500) -> list:
+    """
+    Compress every stored blob that is still plain JSON, batch_size rows per commit.
+    Returns one report dict per column with stored bytes before/after and decode throughput.
+    """
+    reports = []
+    for model, pk, column in _blob_columns():
+        raw = type_coerce(column, LargeBinary)
+        before = db.execute(select(func.coalesce(func.sum(func.length(raw)), 0))).scalar()
+
+        converted = 0
+        last_pk = None
+        while True:
+            query = select(pk, raw).order_by(pk).limit(batch_size)
+            if last_pk is not None:
+                query = query.where(pk > last_pk)
+            rows = db.execute(query).all()
+            if not rows:
+                break
+            for row_pk, value in rows:
+                if value and not is_encoded(value):
+                    encoded = encode_blob(bytes(value))
+                    if is_encoded(encoded):
+                        db.execute(update(model).where(pk == row_pk).values({column.key: encoded}))
+                        converted += 1
+            db.commit()
+            last_pk = rows[-1][0]
+
+        after = db.execute(select(func.coalesce(func.sum(func.length(raw)), 0))).scalar()
+
+        # Decode throughput over everything now stored in the column
+        decoded_bytes = 0
+        start = time.perf_counter()
+        for (value,) in db.execute(select(raw)):
+            decoded_bytes += len(decode_blob(value) or b"")
+        elapsed = time.perf_counter() - start
+
+        reports.append({
+            "column": f"{model.__tablename__}.{column.key}",
+            "rows_converted": converted,
+            "bytes_before": before,
+            "bytes_after": after,
+            "reduction_pct": round(100 * (1 - after / before), 1) if before else 0.0,
+            "decode_mb_per_s": round(decoded_bytes / elapsed / 1e6, 1) if elapsed and decoded_bytes else 0.0,
+        })
+    return reports
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["backfill"]:
+        print("usage: python -m app.database.blob_codec backfill")
+        return 2
+
+    from app.database.database import SessionLocal
+    db = SessionLocal()
+    try:
+        for report in backfill(db):
+            print(
+                f"{report['column']}: {report['rows_converted']} rows compressed, "
+                f"{report['bytes_before']} -> {report['bytes_after']} bytes "
+                f"({report['reduction_pct']}% smaller), decode {report['decode_mb_per_s']} MB/s"
+            )
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
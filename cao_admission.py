@@ -0,0 +1,137 @@
+"""
+Admission control for the agent endpoint.
+
+Each agent admits at most `max_in_flight` concurrent requests and lets up to `max_queue`
+more wait for a slot. Anything beyond that, or a request that waits longer than
+`queue_timeout_seconds`, is rejected straight away so the caller can retry later instead
+of piling more work onto the warehouse. Limits come from `runtime.admission` in app.yaml.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from cao.cao_pool import agent_runtime_config
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10
+DEFAULT_RETRY_AFTER_SECONDS = 2
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Max-in-flight limit with a bounded FIFO wait queue
+    """
+
+    def __init__(self,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 max_queue=DEFAULT_MAX_QUEUE,
+                 queue_timeout_seconds=DEFAULT_QUEUE_TIMEOUT_SECONDS,
+                 retry_after_seconds=DEFAULT_RETRY_AFTER_SECONDS):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_seconds = float(queue_timeout_seconds)
+        self.retry_after_seconds = int(retry_after_seconds)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=1000)
+
+    def _retry_after(self):
+        # Roughly how long the current queue takes to drain, never below the configured floor
+        recent = list(self._waits)[-50:]
+        avg_wait = sum(recent) / len(recent) if recent else 0.0
+        return max(self.retry_after_seconds, math.ceil(avg_wait))
+
+    def _reject(self, reason):
+        self.rejected += 1
+        raise Overloaded(reason, self._retry_after())
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold an execution slot for the duration of the block
+        """
+        start = time.monotonic()
+        if not self._slots.locked():
+            # Free slot: acquire() returns without suspending
+            await self._slots.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self._reject("Too many requests in progress, please retry later")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self._reject("Timed out waiting for an execution slot, please retry later")
+            finally:
+                self.waiting -= 1
+        self._waits.append(time.monotonic() - start)
+
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        waits = sorted(self._waits)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+            "wait_seconds_p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+            "wait_seconds_max": round(waits[-1], 4) if waits else 0.0,
+        }
+
+
+_controllers = {}
+
+
+def get_admission(agent_name):
+    """
+    Admission controller for agent_name
+    """
+    controller = _controllers.get(agent_name)
+    if controller is None:
+        settings = agent_runtime_config(agent_name).get("admission") or {}
+        controller = _controllers[agent_name] = AdmissionController(
+            max_in_flight=settings.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+            max_queue=settings.get("max_queue", DEFAULT_MAX_QUEUE),
+            queue_timeout_seconds=settings.get("queue_timeout_seconds", DEFAULT_QUEUE_TIMEOUT_SECONDS),
+            retry_after_seconds=settings.get("retry_after_seconds", DEFAULT_RETRY_AFTER_SECONDS),
+        )
+    return controller
+
+
+def drop_admission(agent_name):
+    """
+    Forget the controller for agent_name unless requests are still running or waiting on it
+    """
+    controller = _controllers.get(agent_name)
+    if controller is not None and controller.in_flight == 0 and controller.waiting == 0:
+        del _controllers[agent_name]
+
+
+def admission_stats():
+    return {name: controller.stats() for name, controller in _controllers.items()}
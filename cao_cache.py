@@ -0,0 +1,139 @@
+"""
+Exact-match response cache for run_agent.
+
+Responses are keyed on a normalized hash of the conversation, agent, environment,
+application and user identity. Caching is opt-in per agent through the `runtime.response_cache` block
+in app.yaml.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from cao.cao_pool import agent_runtime_config
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(messages, agent_name, env, user_identity, application_name=None):
+    """
+    Stable hash of a run_agent call. Whitespace differences and unset fields
+    in the messages do not change the key.
+    """
+    payload = {
+        "agent_name": agent_name,
+        "env": env,
+        "application_name": application_name,
+        "user_identity": user_identity,
+        "messages": _normalize(messages),
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def replayable(response):
+    """
+    Whether response is plain JSON data that can be handed to more than one caller.
+    Streams and generators can only be consumed once.
+    """
+    if not isinstance(response, (dict, list, str)):
+        return False
+    try:
+        json.dumps(response)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns (hit, response)
+        """
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._items[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, response):
+        if not replayable(response):
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(response))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_caches = {}
+
+
+def get_response_cache(agent_name):
+    """
+    Cache for agent_name, or None when the agent has not opted in
+    """
+    if agent_name in _caches:
+        return _caches[agent_name]
+
+    settings = agent_runtime_config(agent_name).get("response_cache") or {}
+    cache = None
+    if settings.get("enabled"):
+        cache = ResponseCache(
+            max_entries=settings.get("max_entries", DEFAULT_MAX_ENTRIES),
+            ttl_seconds=settings.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+        )
+    _caches[agent_name] = cache
+    return cache
+
+
+def drop_response_cache(agent_name):
+    _caches.pop(agent_name, None)
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items() if cache is not None}
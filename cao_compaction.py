@@ -0,0 +1,221 @@
+"""
+Token-budget compaction of the conversation sent to AgentRun.
+
+Configured per agent through the `runtime.compaction` block in app.yaml:
+
+    compaction:
+      enabled: true
+      max_tokens: 8000              # budget for the whole message list
+      keep_recent: 6                # most recent messages kept verbatim
+      old_message_tokens: 300       # older messages are truncated to this size
+      max_tool_output_tokens: 1000  # cap for any single tool output
+
+System messages and the most recent turns are always kept; keep_recent is extended back
+to the user message that opened the turn. Older turns are truncated first and dropped
+oldest-first if the conversation is still over budget. A tool call and its results
+(tool_use / tool_results in the Cortex format, or role "tool" messages) are kept or
+dropped together. Structured tool output ({"type": "json", "json": {...}}) is counted as
+its JSON text and, when truncated, replaced by a text part holding the truncated JSON.
+Tokens are estimated at ~4 characters per token.
+"""
+import copy
+import json
+import threading
+
+from cao.cao_pool import agent_runtime_config
+
+DEFAULTS = {
+    "enabled": False,
+    "max_tokens": 8000,
+    "keep_recent": 6,
+    "old_message_tokens": 300,
+    "max_tool_output_tokens": 1000,
+}
+TRUNCATED_MARKER = " ...[truncated]"
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def _has_text(part, key):
+    value = part.get(key)
+    # "json" parts may carry the parsed value rather than a string
+    return isinstance(value, str) or (key == "json" and value is not None)
+
+
+def _text(container, key):
+    value = container[key]
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def _parts(message):
+    """
+    Text-bearing parts of a message as (container, key) pairs: content is either a
+    string or a list of typed parts ({"type": "text", "text": ...}, tool results, ...)
+    """
+    content = message.get("content")
+    if isinstance(content, str):
+        return [(message, "content")]
+    parts = []
+    for part in content or []:
+        if isinstance(part, dict):
+            for key in ("text", "content", "json"):
+                if _has_text(part, key):
+                    parts.append((part, key))
+            tool_results = part.get("tool_results")
+            if isinstance(tool_results, dict):
+                for item in tool_results.get("content") or []:
+                    if not isinstance(item, dict):
+                        continue
+                    for key in ("text", "json"):
+                        if _has_text(item, key):
+                            parts.append((item, key))
+    return parts
+
+
+def _is_tool_output(message):
+    if message.get("role") == "tool":
+        return True
+    content = message.get("content")
+    return isinstance(content, list) and any(
+        isinstance(part, dict) and part.get("type") == "tool_results" for part in content
+    )
+
+
+def _opens_turn(message):
+    return message.get("role") == "user" and not _is_tool_output(message)
+
+
+def _tool_units(messages):
+    """
+    Group messages so a tool call and the tool results that answer it stay together
+    """
+    units = []
+    for message in messages:
+        if units and _is_tool_output(message):
+            units[-1].append(message)
+        else:
+            units.append([message])
+    return units
+
+
+def message_tokens(message):
+    # a few tokens of per-message overhead for role and separators
+    return sum(estimate_tokens(_text(container, key)) for container, key in _parts(message)) + 4
+
+
+def truncate_message(message, max_tokens):
+    """
+    Shorten every text part of message so the message fits in max_tokens
+    """
+    parts = _parts(message)
+    budget_chars = max(0, max_tokens - 4) * 4
+    for container, key in parts:
+        text = _text(container, key)
+        share = max(1, budget_chars // len(parts))
+        if len(text) > share:
+            truncated = text[:max(0, share - len(TRUNCATED_MARKER))] + TRUNCATED_MARKER
+            if isinstance(container[key], str):
+                container[key] = truncated
+            else:
+                # Cut JSON is no longer a value, so the part becomes plain text
+                container.clear()
+                container.update({"type": "text", "text": truncated})
+    return message
+
+
+class Compactor:
+    """
+    Applies one agent's compaction settings to a message list
+    """
+
+    def __init__(self, settings):
+        self.settings = {**DEFAULTS, **(settings or {})}
+        self.compacted = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def compact(self, messages):
+        """
+        Returns a compacted copy of messages; the input list is left untouched
+        """
+        s = self.settings
+        messages = copy.deepcopy(list(messages))
+        before = sum(message_tokens(m) for m in messages)
+
+        for message in messages:
+            if _is_tool_output(message) and message_tokens(message) > s["max_tool_output_tokens"]:
+                truncate_message(message, s["max_tool_output_tokens"])
+
+        if sum(message_tokens(m) for m in messages) > s["max_tokens"]:
+            system = [m for m in messages if m.get("role") == "system"]
+            turns = [m for m in messages if m.get("role") != "system"]
+            split = max(0, len(turns) - s["keep_recent"])
+            # Start the recent part at a user turn, so tool results stay with the call they
+            # answer and the kept messages form whole turns
+            while 0 < split < len(turns) and not _opens_turn(turns[split]):
+                split -= 1
+            older, recent = turns[:split], turns[split:]
+
+            for message in older:
+                if message_tokens(message) > s["old_message_tokens"]:
+                    truncate_message(message, s["old_message_tokens"])
+
+            # Drop whole call/result units, oldest first
+            units = _tool_units(older)
+            total = sum(message_tokens(m) for m in system + older + recent)
+            while units and total > s["max_tokens"]:
+                total -= sum(message_tokens(m) for m in units.pop(0))
+            # The conversation must still open with a user turn (not a tool result)
+            while units and not _opens_turn(units[0][0]):
+                units.pop(0)
+            messages = system + [m for unit in units for m in unit] + recent
+
+        after = sum(message_tokens(m) for m in messages)
+        with self._lock:
+            if after < before:
+                self.compacted += 1
+            self.tokens_before += before
+            self.tokens_after += after
+        return messages
+
+    def stats(self):
+        return {
+            "max_tokens": self.settings["max_tokens"],
+            "requests_compacted": self.compacted,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+        }
+
+
+_compactors = {}
+
+
+def get_compactor(agent_name):
+    """
+    Compactor for agent_name, or None when compaction is not enabled
+    """
+    if agent_name in _compactors:
+        return _compactors[agent_name]
+
+    settings = agent_runtime_config(agent_name).get("compaction") or {}
+    compactor = Compactor(settings) if settings.get("enabled") else None
+    _compactors[agent_name] = compactor
+    return compactor
+
+
+def compact_messages(messages, agent_name):
+    compactor = get_compactor(agent_name)
+    if compactor is None:
+        return messages
+    return compactor.compact(messages)
+
+
+def drop_compactor(agent_name):
+    _compactors.pop(agent_name, None)
+
+
+def compaction_stats():
+    return {name: c.stats() for name, c in _compactors.items() if c is not None}
@@ -1,19 +1,20 @@
-import decimal
 from fastapi import FastAPI, Body, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List
-from snowflake_auth import SnowflakeAuthManager
+from typing import List, Optional
+import asyncio
 import json
-import os
-import yaml
-from models import AgentRequest, FilterDataRequest
+from models import AgentRequest
 from validator import validate_agent_request
-from models import EnvName
-import io
 
 from cao.CAO_AGENT import run_agent
+from cao.cao_pool import warm_pools, pool_stats, agent_runtime_config
+from cao.cao_cache import cache_stats
+from cao.cao_compaction import compaction_stats
+from cao.cao_singleflight import inflight_stats
+from cao.cao_admission import get_admission, admission_stats, Overloaded
+from cao.cao_registry import MULTI_AGENT, resolve_agent, eviction_loop, registry_stats
 
 app = FastAPI()
 
@@ -34,21 +35,161 @@ class DataRequest(BaseModel):
     paid_end_date: str
     disalwd_explntn_cd: str = ""
 
+class BatchAgentRequest(BaseModel):
+    requests: List[AgentRequest]
+    max_concurrency: Optional[int] = None
+
 import logging
 logger = logging.getLogger(__name__)
 
-@app.post("/run_{{application_name}}_agent")
-async def run_{{application_name}}_agent_endpoint(
-    request: AgentRequest = Body(..., example=None)
-):
+DEFAULT_BATCH_CONCURRENCY = 4
+
+@app.on_event("startup")
+async def warm_agent_pool():
+    if MULTI_AGENT:
+        # Agents are loaded on first request; idle ones are released in the background
+        app.state.eviction_task = asyncio.create_task(eviction_loop())
+    else:
+        # Build the agent's runners once so requests only check one out
+        warm_pools(["{{agent_name}}"])
+
+
+async def _run_request(request, agent_name):
     error = validate_agent_request(request)
     if error:
         return error
     messages = [msg.model_dump() for msg in request.messages]
     print("Calling the run agent")
-    return await run_agent(
-        messages,
-        request.application_name,
-        request.user_identity,
-        "{{agent_name}}"
-    )
+    try:
+        async with get_admission(agent_name).admit():
+            return await run_agent(
+                messages,
+                request.application_name,
+                request.user_identity,
+                agent_name
+            )
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@app.post("/run_{{application_name}}_agent")
+async def run_{{application_name}}_agent_endpoint(
+    request: AgentRequest = Body(..., example=None)
+):
+    return await _run_request(request, "{{agent_name}}")
+
+
+def _json_default(value):
+    import decimal  # only needed when a batch result is not plain JSON
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return str(value)
+
+
+def _error_detail(error):
+    body = getattr(error, "body", None)
+    if body:
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body.decode(errors="replace")
+    return str(error)
+
+
+async def _run_batch_item(index, request, agent_name, slots):
+    """
+    Run one batch item. Failures are reported in the item instead of raised.
+    """
+    async with slots:
+        try:
+            error = validate_agent_request(request)
+            if error:
+                return {"index": index, "status_code": getattr(error, "status_code", 400), "error": _error_detail(error)}
+            messages = [msg.model_dump() for msg in request.messages]
+            async with get_admission(agent_name).admit():
+                response = await run_agent(
+                    messages,
+                    request.application_name,
+                    request.user_identity,
+                    agent_name
+                )
+            return {"index": index, "status_code": 200, "response": response}
+        except Overloaded as e:
+            return {"index": index, "status_code": 429, "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.exception(f"Batch item {index} failed")
+            return {"index": index, "status_code": 500, "error": str(e)}
+
+
+def _run_batch(batch, agent_name):
+    """
+    Run many conversations concurrently and stream one JSON line per item as it finishes.
+    Each line carries the item's index in the request list.
+    """
+    limit = get_admission(agent_name).max_in_flight
+    configured = agent_runtime_config(agent_name).get("batch", {}).get("max_concurrency", DEFAULT_BATCH_CONCURRENCY)
+    concurrency = max(1, min(batch.max_concurrency or configured, configured, limit))
+    slots = asyncio.Semaphore(concurrency)
+
+    async def stream():
+        tasks = [
+            asyncio.create_task(_run_batch_item(i, request, agent_name, slots))
+            for i, request in enumerate(batch.requests)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                yield json.dumps(item, default=_json_default) + "\n"
+        finally:
+            # Client went away: stop the remaining items
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/run_{{application_name}}_agent/batch")
+async def run_{{application_name}}_agent_batch_endpoint(
+    batch: BatchAgentRequest = Body(..., example=None)
+):
+    return _run_batch(batch, "{{agent_name}}")
+
+
+def _routed_agent(agent_name):
+    resolved = resolve_agent(agent_name)
+    if not resolved:
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' is not configured")
+    return resolved
+
+
+if MULTI_AGENT:
+    @app.post("/agents/{agent_name}/run")
+    async def run_routed_agent_endpoint(
+        agent_name: str,
+        request: AgentRequest = Body(..., example=None)
+    ):
+        return await _run_request(request, _routed_agent(agent_name))
+
+
+    @app.post("/agents/{agent_name}/run/batch")
+    async def run_routed_agent_batch_endpoint(
+        agent_name: str,
+        batch: BatchAgentRequest = Body(..., example=None)
+    ):
+        return _run_batch(batch, _routed_agent(agent_name))
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return {
+        "pools": pool_stats(),
+        "response_cache": cache_stats(),
+        "compaction": compaction_stats(),
+        "inflight": inflight_stats(),
+        "admission": admission_stats(),
+        "agents": registry_stats(),
+    }
@@ -0,0 +1,262 @@
+"""
+Offline load-test harness for the generated service.
+
+Two parts, both stdlib only:
+
+  fake-server  A local stand-in for the Snowflake endpoints the agent calls
+               (session login / OAuth token, Cortex agent run, Cortex complete) with
+               configurable latency distribution and error rate.
+  drive        Sends AgentRequest traffic to a running cao_fastapi service at a target
+               rate (open loop) and reports latency percentiles and throughput.
+
+    python -m cao.cao_loadtest fake-server --port 8089 --latency lognormal:800:0.4 --error-rate 0.02
+    CAO_SNOWFLAKE_BASE_URL=http://localhost:8089 uvicorn cao_fastapi:app --port 8000
+    python -m cao.cao_loadtest drive --url http://localhost:8000/run_myapp_agent --rps 20 --duration 60
+
+CAO_SNOWFLAKE_BASE_URL is read by cao_pool and sent to every AgentRun builder, so the
+service talks to the fake server instead of Snowflake.
+
+Latency is measured from each request's scheduled send time (start + i / rps), not from
+when a worker picked it up, so a stalled driver or service shows up in the percentiles
+instead of being hidden (coordinated omission). max_start_lag_ms reports how far
+behind schedule requests were actually sent.
+
+Latency specs (milliseconds): "fixed:200", "uniform:100:400", "lognormal:<median>:<sigma>".
+--requests replays a JSONL file with one AgentRequest body per line; without it a
+synthetic single-turn request is sent.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ---------------------------------------------------------------------
+# Fake Snowflake / Cortex server
+# ---------------------------------------------------------------------
+def parse_latency(spec):
+    """
+    Returns a function that samples a latency in seconds from spec
+    """
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda: params[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(params[0], params[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = params
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"Unknown latency spec '{spec}'. Use fixed:ms, uniform:lo:hi or lognormal:median:sigma")
+
+
+def _answer_text(body):
+    messages = body.get("messages") or []
+    last = messages[-1] if messages else {}
+    content = last.get("content")
+    if isinstance(content, list):
+        content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+    return f"Synthetic answer to: {str(content or '')[:200]}"
+
+
+def make_handler(latency, error_rate, auth_latency):
+    class FakeSnowflakeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_events(self, events):
+            data = "".join(f"event: {name}\ndata: {json.dumps(payload)}\n\n" for name, payload in events).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                body = {}
+
+            # Auth: password/key-pair session login and OAuth token exchange
+            if self.path.startswith("/session/v1/login-request") or self.path.startswith("/oauth/token"):
+                time.sleep(auth_latency())
+                token = uuid.uuid4().hex
+                return self._send_json(200, {
+                    "success": True,
+                    "access_token": token,
+                    "expires_in": 3600,
+                    "data": {"token": token, "masterToken": uuid.uuid4().hex, "validityInSeconds": 3600},
+                })
+
+            time.sleep(latency())
+            if random.random() < error_rate:
+                return self._send_json(503, {"message": "Service temporarily unavailable (injected)"})
+
+            text = _answer_text(body)
+            if self.path.startswith("/api/v2/cortex/agent:run"):
+                return self._send_events([
+                    ("message.delta", {"delta": {"content": [{"type": "text", "text": text}]}}),
+                    ("done", {}),
+                ])
+            if self.path.startswith("/api/v2/cortex/inference:complete"):
+                if body.get("stream", True):
+                    return self._send_events([("message", {"choices": [{"delta": {"content": text}}]})])
+                return self._send_json(200, {"choices": [{"message": {"content": text}}]})
+            return self._send_json(404, {"message": f"No fake endpoint for {self.path}"})
+
+    return FakeSnowflakeHandler
+
+
+def serve_fake(port, latency="lognormal:800:0.4", error_rate=0.0, auth_latency="fixed:50", host="127.0.0.1"):
+    """
+    Start the fake server in a background thread and return it
+    """
+    handler = make_handler(parse_latency(latency), error_rate, parse_latency(auth_latency))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------
+# Load driver
+# ---------------------------------------------------------------------
+def synthetic_request(i):
+    return {
+        "application_name": "loadtest",
+        "user_identity": f"loadtest-user-{i % 50}",
+        "messages": [{"role": "user", "content": f"Load test question {i}: summarize claims for member {i % 500}"}],
+    }
+
+
+def load_requests(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _send(url, body, timeout):
+    data = json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 0
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def drive(url, rps, duration, requests=None, timeout=60.0, max_workers=256):
+    """
+    Open-loop load: requests are started on schedule whether or not earlier ones finished.
+    Each latency is measured from the request's scheduled time. Returns a summary dict.
+    """
+    total = int(rps * duration)
+    results = []
+    lags = []
+    lock = threading.Lock()
+
+    def task(i, scheduled):
+        body = requests[i % len(requests)] if requests else synthetic_request(i)
+        lag = time.perf_counter() - scheduled
+        status = _send(url, body, timeout)
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            results.append((status, elapsed))
+            lags.append(lag)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(task, i, scheduled)
+    wall = time.perf_counter() - start
+
+    ok = sorted(elapsed * 1000 for status, elapsed in results if 200 <= status < 300)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "sent": total,
+        "completed": len(results),
+        "succeeded": len(ok),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ok, 50), 1),
+            "p90": round(percentile(ok, 90), 1),
+            "p95": round(percentile(ok, 95), 1),
+            "p99": round(percentile(ok, 99), 1),
+            "max": round(ok[-1], 1) if ok else 0.0,
+        },
+        "max_start_lag_ms": round(max(lags) * 1000, 1) if lags else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the agent service")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fake = sub.add_parser("fake-server", help="run a fake Snowflake/Cortex endpoint")
+    fake.add_argument("--host", default="127.0.0.1")
+    fake.add_argument("--port", type=int, default=8089)
+    fake.add_argument("--latency", default="lognormal:800:0.4")
+    fake.add_argument("--auth-latency", default="fixed:50")
+    fake.add_argument("--error-rate", type=float, default=0.0)
+
+    load = sub.add_parser("drive", help="send traffic to a running service")
+    load.add_argument("--url", required=True)
+    load.add_argument("--rps", type=float, default=10)
+    load.add_argument("--duration", type=float, default=30, help="seconds")
+    load.add_argument("--requests", help="JSONL file with one AgentRequest per line")
+    load.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    if args.command == "fake-server":
+        server = serve_fake(args.port, args.latency, args.error_rate, args.auth_latency, args.host)
+        print(f"Fake Snowflake listening on http://{args.host}:{server.server_port} "
+              f"(latency {args.latency}, error rate {args.error_rate})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    requests = load_requests(args.requests) if args.requests else None
+    print(json.dumps(drive(args.url, args.rps, args.duration, requests, args.timeout), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Warm pool of AgentRun runners with live Snowflake sessions.
+
+Each (agent_name, env) pool keeps warm runners. A runner is a Snowflake session that is
+opened (login / token exchange) once, at startup or the first time the pool is short,
+and then reused by one request at a time. A request gets a fresh AgentRun.Builder
+configured from the pool's immutable template (connection settings from app.yaml,
+agent db/schema) with the runner's session attached, so nothing a request sets on its
+builder can leak into the next one and build() does not log in again.
+
+Session reuse needs the agent stack to provide `AgentRun.open_session(builder)`, which
+returns a logged-in session for a configured builder, and `Builder.session(session)`.
+A session with an `expired()` method that returns True is reopened at checkout, and a
+session whose run raised is closed rather than reused. With an agent stack that lacks
+open_session, runners hold no session and build() authenticates every run.
+
+The pool never limits concurrency: when every warm runner is busy a new session is
+opened, and at most `pool_size` idle runners are kept. Concurrent runs are bounded by
+admission control (`runtime.admission.max_in_flight`), which is also the default pool size.
+
+CAO_SNOWFLAKE_BASE_URL, when set, is passed to every builder as its base_url so all
+Snowflake calls (login, agent run, complete) go to that host instead, e.g. the fake
+server from cao_loadtest. Unset in normal deployments.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from models import EnvName
+
+DEFAULT_POOL_SIZE = int(os.getenv("CAO_POOL_SIZE", "16"))
+SNOWFLAKE_BASE_URL = os.getenv("CAO_SNOWFLAKE_BASE_URL")
+
+
+@lru_cache(maxsize=1)
+def load_config():
+    """
+    Load app.yaml once per process
+    """
+    import yaml
+
+    config_path = os.path.join(os.environ.get("GENAI_PATH", "dev").lower(), "app.yaml")
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def current_env():
+    """
+    Get environment from env_name host variable, validated against EnvName
+    """
+    env = os.getenv('env_name')
+    valid_envs = {e.value for e in EnvName}
+    if env not in valid_envs:
+        raise ValueError(f"Invalid environment '{env}'. Must be one of: {', '.join(valid_envs)}")
+    return env
+
+
+def agent_env_config(agent_name, env):
+    """
+    Connection settings for the given agent_name and environment
+    """
+    return load_config().get("Agents", {}).get(agent_name, {}).get(env, {})
+
+
+def agent_runtime_config(agent_name):
+    """
+    Runtime tuning block (`runtime:`) for the given agent_name
+    """
+    return load_config().get("Agents", {}).get(agent_name, {}).get("runtime", {}) or {}
+
+
+def runner_template(agent_name, env):
+    """
+    Builder settings for agent_name in env, as ((setter, value), ...)
+    """
+    agent_config = agent_env_config(agent_name, env)
+    template = (
+        ("aplctn_cd", agent_config.get("aplctn_cd", "aedl")),
+        ("env", agent_config.get("env", "preprod")),
+        ("region_name", agent_config.get("region_name", "us-east-1")),
+        ("warehouse_size_suffix", agent_config.get("warehouse_size_suffix", "")),
+        ("prefix", agent_config.get("prefix", "")),
+        ("agent_name", agent_name),
+        ("agent_db", agent_config.get("db", "POC_SPC_SNOWPARK_DB")),
+        ("agent_schema", agent_config.get("schema", "DATA_SCHEMA")),
+    )
+    if SNOWFLAKE_BASE_URL:
+        template += (("base_url", SNOWFLAKE_BASE_URL),)
+    return template
+
+
+def _close_session(session):
+    close = getattr(session, "close", None)
+    if close is not None:
+        close()
+
+
+class RunnerPool:
+    """
+    Warm runners (live sessions) for one (agent_name, env), keeping at most `size` idle
+    """
+
+    def __init__(self, agent_name, env, size=DEFAULT_POOL_SIZE):
+        self.agent_name = agent_name
+        self.env = env
+        self.size = max(1, int(size))
+        self.template = runner_template(agent_name, env)
+        self._idle = deque()
+        self._in_use = 0
+        self.sessions_opened = 0
+        self.last_used = time.monotonic()
+
+    def new_builder(self, session=None):
+        """
+        A fresh builder configured from the template, using session when given
+        """
+        # The agent stack (Snowflake client, HTTP, auth) is imported on first use,
+        # at pool warm-up, rather than when the service module is imported
+        from agent import AgentRun
+
+        builder = AgentRun.Builder()
+        for setter, value in self.template:
+            if setter == "base_url" and not hasattr(builder, "base_url"):
+                raise RuntimeError("CAO_SNOWFLAKE_BASE_URL is set but AgentRun.Builder has no base_url()")
+            builder = getattr(builder, setter)(value)
+        if session is not None:
+            builder = builder.session(session)
+        return builder
+
+    def _open_session(self):
+        from agent import AgentRun
+
+        if not hasattr(AgentRun, "open_session"):
+            return None
+        session = AgentRun.open_session(self.new_builder())
+        self.sessions_opened += 1
+        return session
+
+    def _usable(self, session):
+        expired = getattr(session, "expired", None)
+        if expired is not None and expired():
+            _close_session(session)
+            return False
+        return True
+
+    def warm(self):
+        """
+        Fill the pool up to its size
+        """
+        while len(self._idle) < self.size:
+            self._idle.append(self._open_session())
+
+    @asynccontextmanager
+    async def checkout(self):
+        """
+        Borrow a warm runner's session (opening one when none is idle) and yield a
+        fresh builder using it. Never waits. A session whose run fails is closed.
+        """
+        self.last_used = time.monotonic()
+        session = None
+        while self._idle:
+            candidate = self._idle.popleft()
+            if candidate is None or self._usable(candidate):
+                session = candidate
+                break
+        else:
+            session = await asyncio.to_thread(self._open_session)
+
+        self._in_use += 1
+        try:
+            yield self.new_builder(session)
+        except BaseException:
+            if session is not None:
+                _close_session(session)
+            raise
+        else:
+            if len(self._idle) < self.size:
+                self._idle.append(session)
+            elif session is not None:
+                _close_session(session)
+        finally:
+            self._in_use -= 1
+
+    def close(self):
+        """
+        Close the idle sessions; sessions checked out are closed when returned
+        """
+        self.size = 0
+        while self._idle:
+            session = self._idle.popleft()
+            if session is not None:
+                _close_session(session)
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "sessions_opened": self.sessions_opened,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+_pools = {}
+
+
+def get_pool(agent_name, env=None):
+    """
+    Get (or create) the pool for agent_name in the current environment
+    """
+    env = env or current_env()
+    key = (agent_name, env)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = RunnerPool(agent_name, env, pool_size(agent_name))
+    return pool
+
+
+def pool_size(agent_name):
+    """
+    `runtime.pool_size`, defaulting to the agent's admission limit so every admitted
+    request can find a warm runner
+    """
+    runtime = agent_runtime_config(agent_name)
+    admission = runtime.get("admission") or {}
+    return runtime.get("pool_size") or admission.get("max_in_flight") or DEFAULT_POOL_SIZE
+
+
+def known_agents():
+    """
+    Agent names configured under `Agents:` in app.yaml
+    """
+    return list((load_config().get("Agents") or {}).keys())
+
+
+def drop_pool(agent_name, env=None):
+    """
+    Forget the pool for agent_name and close its idle sessions.
+    Runners still checked out finish their request normally.
+    """
+    pool = _pools.pop((agent_name, env or current_env()), None)
+    if pool is None:
+        return False
+    pool.close()
+    return True
+
+
+def pools_by_idle_time():
+    """
+    Pools with nothing checked out, least recently used first
+    """
+    idle = [pool for pool in _pools.values() if pool.in_use == 0]
+    return sorted(idle, key=lambda pool: pool.last_used)
+
+
+def warm_pools(agent_names):
+    """
+    Build the pools for the given agents at startup
+    """
+    for agent_name in agent_names:
+        get_pool(agent_name).warm()
+
+
+def pool_stats():
+    return {f"{name}:{env}": pool.stats() for (name, env), pool in _pools.items()}
@@ -0,0 +1,108 @@
+"""
+Multi-agent hosting for the generated runtime.
+
+With CAO_MULTI_AGENT enabled one process serves every agent under `Agents:` in app.yaml.
+Agents are loaded lazily on their first request, and a background task releases the per-agent
+state (builder pool, response cache, admission controller, compaction settings) of idle agents
+when too many are warm or the process uses more memory than allowed. An evicted agent is
+loaded again from app.yaml on its next request.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from cao.cao_pool import known_agents, drop_pool, pools_by_idle_time, pool_stats, current_env
+from cao.cao_cache import drop_response_cache
+from cao.cao_admission import drop_admission
+from cao.cao_compaction import drop_compactor
+
+logger = logging.getLogger(__name__)
+
+MULTI_AGENT = os.getenv("CAO_MULTI_AGENT", "false").lower() in ("1", "true", "yes")
+MAX_WARM_AGENTS = int(os.getenv("CAO_MAX_WARM_AGENTS", "8"))
+MAX_RSS_MB = int(os.getenv("CAO_MAX_RSS_MB", "0"))
+AGENT_IDLE_SECONDS = int(os.getenv("CAO_AGENT_IDLE_SECONDS", "600"))
+EVICTION_INTERVAL_SECONDS = int(os.getenv("CAO_EVICTION_INTERVAL_SECONDS", "30"))
+
+evictions = 0
+
+
+def resolve_agent(agent_name):
+    """
+    Map a routed agent name onto its key in app.yaml, or None if it is not configured.
+    Generated keys are upper case, so matching is case-insensitive.
+    """
+    agents = known_agents()
+    if agent_name in agents:
+        return agent_name
+    by_upper = {name.upper(): name for name in agents}
+    return by_upper.get(agent_name.upper())
+
+
+def rss_mb():
+    """
+    Resident memory of this process in MB (Linux), or None if unavailable
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _evict(pool, reason):
+    global evictions
+    drop_pool(pool.agent_name, pool.env)
+    drop_response_cache(pool.agent_name)
+    drop_admission(pool.agent_name)
+    drop_compactor(pool.agent_name)
+    evictions += 1
+    logger.info(f"Evicted warm state for {pool.agent_name} ({reason})")
+
+
+def evict_idle_agents():
+    """
+    Release warm state of idle agents, least recently used first.
+    Agents idle longer than AGENT_IDLE_SECONDS are always released; otherwise
+    agents are released only while over MAX_WARM_AGENTS or MAX_RSS_MB.
+    """
+    warm = len(pool_stats())
+    now = time.monotonic()
+    for pool in pools_by_idle_time():
+        if now - pool.last_used > AGENT_IDLE_SECONDS:
+            _evict(pool, "idle")
+        elif warm > MAX_WARM_AGENTS:
+            _evict(pool, "too many warm agents")
+        elif MAX_RSS_MB and (rss_mb() or 0) > MAX_RSS_MB:
+            # Memory is only returned gradually, so release one agent per pass
+            _evict(pool, "memory pressure")
+            break
+        else:
+            break
+        warm -= 1
+
+
+async def eviction_loop():
+    while True:
+        await asyncio.sleep(EVICTION_INTERVAL_SECONDS)
+        try:
+            evict_idle_agents()
+        except Exception:
+            logger.exception("Agent eviction failed")
+
+
+def registry_stats():
+    try:
+        env = current_env()
+    except ValueError:
+        env = None
+    return {
+        "multi_agent": MULTI_AGENT,
+        "env": env,
+        "configured_agents": len(known_agents()),
+        "warm_agents": len(pool_stats()),
+        "evictions": evictions,
+        "rss_mb": round(rss_mb() or 0, 1),
+    }
@@ -0,0 +1,85 @@
+"""
+Request coalescing for run_agent.
+
+Concurrent calls that share a request key wait on a single in-flight execution
+and all receive its result. Only JSON results are shared (each joined caller gets its
+own copy); when the execution returns something that can be consumed once, such as a
+StreamingResponse or a generator, every joined caller runs its own execution instead.
+The execution is cancelled once its last waiter goes away.
+"""
+import asyncio
+import copy
+
+from cao.cao_cache import replayable
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.ran_separately = 0
+        self.cancelled = 0
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn):
+        """
+        Run fn() for key, or join the execution already in flight for key
+        """
+        call = self._calls.get(key)
+        owner = call is None
+        if owner:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            # shield: one waiter disconnecting must not cancel the shared execution
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+                self.cancelled += 1
+
+        if owner:
+            return result
+        if not replayable(result):
+            # The owner consumes this result; a stream cannot be handed out twice
+            self.ran_separately += 1
+            return await fn()
+        return copy.deepcopy(result)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "ran_separately": self.ran_separately,
+            "cancelled": self.cancelled,
+        }
+
+
+inflight = SingleFlight()
+
+
+def inflight_stats():
+    return inflight.stats()
@@ -0,0 +1,111 @@
+"""
+Cold-start report for the generated service.
+
+Starts cao_fastapi in a fresh interpreter with `-X importtime`: imports the module, then
+runs the app's lifespan startup (pool warm-up, which loads the agent stack) the way
+uvicorn does. Prints the slowest modules (cumulative and self time) imported anywhere
+before the app is ready, and fails when time-to-ready is over budget. Run it during
+the image build, after installing dependencies (test_cao_startup_report checks the
+report itself against a stub agent stack):
+
+    python -m cao.cao_startup_report --compile --budget-ms 1500
+
+--compile precompiles the package to bytecode first so the measurement (and the
+container's first start) does not pay for compiling the sources.
+"""
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = int(os.getenv("CAO_COLD_START_BUDGET_MS", "1500"))
+
+
+# Imports the module, then enters the app's lifespan so startup handlers run
+STARTUP_SCRIPT = """
+import asyncio, importlib, json, sys, time
+sys.path[:0] = {sys_path!r}
+start = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+
+async def ready():
+    async with module.app.router.lifespan_context(module.app):
+        return time.perf_counter()
+
+started = asyncio.run(ready())
+print(json.dumps({{"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}}))
+"""
+
+
+def measure_startup(module="cao_fastapi", root=PACKAGE_ROOT, sys_path=()):
+    """
+    Import module and run its app's startup in a subprocess with -X importtime.
+    sys_path entries are searched before root. Returns {"import_ms", "startup_ms",
+    "ready_ms", "rows"} where rows is a list of (module, self_us, cumulative_us, depth)
+    for every import before the app was ready, in the order they finished.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT.format(module=module, sys_path=list(sys_path))],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Starting {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    timings["ready_ms"] = timings["import_ms"] + timings["startup_ms"]
+    timings["rows"] = rows
+    return timings
+
+
+def report(result, top=15):
+    rows = result["rows"]
+    top_level = [r for r in rows if r[3] == 0]
+    total_us = sum(r[2] for r in top_level)
+
+    print(f"Time to ready: {result['ready_ms']:.1f} ms "
+          f"(import {result['import_ms']:.1f} ms, startup {result['startup_ms']:.1f} ms)")
+    print(f"Imports: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+    print(f"Slowest by cumulative time (top {top}):")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+    print(f"\nSlowest by self time (top {top}):")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+    return result["ready_ms"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the service")
+    parser.add_argument("--module", default="cao_fastapi")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--compile", action="store_true", help="precompile the package to bytecode first")
+    args = parser.parse_args(argv)
+
+    if args.compile:
+        compileall.compile_dir(PACKAGE_ROOT, quiet=1, workers=0)
+
+    ready_ms = report(measure_startup(args.module), args.top)
+    if ready_ms > args.budget_ms:
+        print(f"\nFAIL: time to ready {ready_ms:.1f} ms exceeds budget {args.budget_ms} ms")
+        return 1
+    print(f"\nOK: time to ready {ready_ms:.1f} ms within budget {args.budget_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,64 @@
 """
 Database configuration and session management
+
+Writes go through SessionLocal, bound to the primary. Read-only endpoints use
+get_read_db, whose sessions send queries to the replicas listed in
+DATABASE_REPLICA_URLS (comma separated) and fall back to the primary when none are set.
 """
-from sqlalchemy import create_engine
+import os
+import itertools
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import DATABASE_URL
 
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+
+def _create_engine(url):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {}
+    )
+
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+engine = _create_engine(DATABASE_URL)
+replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines) if replica_engines else None
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica until it writes. From the first flush or DML
+    statement on, the session sticks to the primary so it reads its own writes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # One replica per session keeps its reads consistent with each other
+        self._replica = next(_replica_cycle) if _replica_cycle else None
+        self.use_primary = self._replica is None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if clause is not None and getattr(clause, "is_dml", False):
+            self.use_primary = True
+        if self.use_primary:
+            return engine
+        return self._replica
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _stick_to_primary(session, flush_context, instances):
+    # Runs only when there is something to write, before any statement is sent
+    session.use_primary = True
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -30,9 +74,23 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Dependency to get a replica-routed session for read-only endpoints
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def init_db():
     """
-    Initialize database tables
+    Initialize database tables and default data.
+    Skips DDL and seeding when the schema stamp is current; otherwise one worker
+    migrates under a lock. Returns the migration versions applied by this process.
     """
     from app.database.data_classes import ssa_models, lsa_models  # Import here to avoid circular import
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app.database.migrations import ensure_schema
+    return ensure_schema(engine)
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""
+FastAPI dependencies
+"""
+from app.database.database import get_db, get_read_db
+
+__all__ = ["get_db", "get_read_db"]
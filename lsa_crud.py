@@ -127,6 +127,17 @@ def delete_provider(db: Session, provider_id: str) -> bool:
     return True
 
 
+def set_provider_rate_limit(db: Session, provider_id: str, requests_per_minute: Optional[int], burst: Optional[int] = None) -> Optional[LLMProvider]:
+    provider = get_provider_by_id(db, provider_id)
+    if not provider:
+        return None
+    provider.requests_per_minute = requests_per_minute
+    provider.burst = burst
+    db.commit()
+    db.refresh(provider)
+    return provider
+
+
 # ============================================================
 # LLM Model CRUD
 # ============================================================
@@ -151,6 +162,17 @@ def get_llm_by_id(db: Session, model_id: str) -> Optional[LLMModel]:
     return db.query(LLMModel).filter(LLMModel.model_id == model_id).first()
 
 
+def set_llm_rate_limit(db: Session, model_id: str, requests_per_minute: Optional[int], burst: Optional[int] = None) -> Optional[LLMModel]:
+    llm = get_llm_by_id(db, model_id)
+    if not llm:
+        return None
+    llm.requests_per_minute = requests_per_minute
+    llm.burst = burst
+    db.commit()
+    db.refresh(llm)
+    return llm
+
+
 def delete_llm_model(db: Session, model_id: str) -> bool:
     llm = db.query(LLMModel).filter(LLMModel.model_id == model_id).first()
     if not llm:
@@ -0,0 +1,238 @@
+"""
+Latency-aware routing across LLM models
+
+Tracks rolling latency and error rate for every model it calls. A request goes to the
+agent's model first and fails over to configured equivalents when it errors. Unhealthy
+models are tried last. With hedging enabled, a second request is sent to the next
+candidate once the first has been outstanding longer than its recent p95 latency,
+and whichever answers first wins.
+
+Calls pass through an optional rate limiter (see lsa_rate_limit) before they are sent;
+time spent waiting for it is not counted as model latency. The hedge delay starts once
+the first request has its token, and a hedge is only sent when the next candidate has a
+token free, so hedging never queues behind other traffic.
+
+Equivalents are listed in the agent profile's agent_json, e.g.
+{
+    "llm_fallbacks": ["claude-4-sonnet", "mistral-large"]
+}
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.crud import lsa_crud
+from app.database.blob_codec import loads_json
+
+logger = logging.getLogger(__name__)
+
+Invoke = Callable[[str, dict], Awaitable[dict]]
+
+ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "100"))
+ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "500"))
+HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000"))
+
+
+class LLMRoutingError(Exception):
+    """
+    Raised when every candidate model failed
+    """
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        detail = "; ".join(f"{model}: {error}" for model, error in errors.items())
+        super().__init__(f"All candidate models failed: {detail}")
+
+
+class ModelStats:
+    """
+    Rolling window of (latency_ms, ok) samples for one model
+    """
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges_won = 0
+
+    def record(self, latency_ms: float, ok: bool):
+        with self._lock:
+            self._samples.append((latency_ms, ok))
+            self.requests += 1
+
+    def p95_ms(self) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < ROUTER_MIN_SAMPLES:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "p95_ms": self.p95_ms(),
+            "error_rate": round(self.error_rate(), 4),
+            "hedges_won": self.hedges_won,
+        }
+
+
+class LLMRouter:
+    """
+    Routes a completion to a model and its equivalents.
+    invoke(model_id, payload) performs the provider call for one model.
+    """
+
+    def __init__(
+        self,
+        invoke: Invoke,
+        hedge: bool = HEDGE_ENABLED,
+        hedge_min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+        max_error_rate: float = ROUTER_MAX_ERROR_RATE,
+        limiter=None
+    ):
+        self.invoke = invoke
+        self.hedge = hedge
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.max_error_rate = max_error_rate
+        self.limiter = limiter
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def stats_for(self, model_id: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(model_id, ModelStats())
+
+    def candidates(self, model_id: str, equivalents: Optional[List[str]] = None) -> List[str]:
+        """
+        Primary model first, then equivalents by p95 latency. Models over the
+        error-rate threshold keep their relative order but move to the end.
+        """
+        fallbacks = [m for m in dict.fromkeys(equivalents or []) if m != model_id]
+        fallbacks.sort(key=lambda m: self.stats_for(m).p95_ms() or float("inf"))
+        ordered = [model_id] + fallbacks
+        healthy = [m for m in ordered if self.stats_for(m).error_rate() <= self.max_error_rate]
+        return healthy + [m for m in ordered if m not in healthy]
+
+    def hedge_delay(self, model_id: str) -> float:
+        """
+        Seconds to wait on model_id before hedging to the next candidate
+        """
+        p95 = self.stats_for(model_id).p95_ms()
+        return max(self.hedge_min_delay_ms, p95 if p95 is not None else HEDGE_DEFAULT_DELAY_MS) / 1000
+
+    async def _attempt(self, model_id: str, payload: dict, agent_id: str, granted: asyncio.Event, acquired: bool = False):
+        if self.limiter is not None and not acquired:
+            await self.limiter.acquire(model_id, agent_id)
+        granted.set()
+        start = time.perf_counter()
+        try:
+            result = await self.invoke(model_id, payload)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not an error, but the elapsed time is a lower bound on
+            # its latency and keeps the slow model's p95 from looking better than it is
+            self.stats_for(model_id).record((time.perf_counter() - start) * 1000, True)
+            raise
+        except Exception:
+            self.stats_for(model_id).record((time.perf_counter() - start) * 1000, False)
+            raise
+        self.stats_for(model_id).record((time.perf_counter() - start) * 1000, True)
+        return result
+
+    async def complete(
+        self,
+        model_id: str,
+        payload: dict,
+        equivalents: Optional[List[str]] = None,
+        agent_id: str = "default"
+    ) -> dict:
+        """
+        Returns {"model_id": <model that answered>, "result": <invoke result>}
+        """
+        candidates = self.candidates(model_id, equivalents)
+        running: Dict[asyncio.Task, str] = {}
+        granted: Dict[asyncio.Task, asyncio.Event] = {}
+        errors: Dict[str, Exception] = {}
+        next_index = 0
+        hedge = self.hedge
+
+        def launch(acquired: bool = False):
+            nonlocal next_index
+            model = candidates[next_index]
+            next_index += 1
+            event = asyncio.Event()
+            task = asyncio.create_task(self._attempt(model, payload, agent_id, event, acquired))
+            running[task], granted[task] = model, event
+
+        launch()
+        try:
+            while running:
+                # Hedge only while a single request is outstanding and a candidate is left
+                timeout = None
+                if hedge and len(running) == 1 and next_index < len(candidates):
+                    task = next(iter(running))
+                    if not granted[task].is_set():
+                        # The hedge delay starts once the request is past the rate limiter
+                        gate = asyncio.create_task(granted[task].wait())
+                        await asyncio.wait({task, gate}, return_when=asyncio.FIRST_COMPLETED)
+                        gate.cancel()
+                    timeout = self.hedge_delay(running[task])
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if self.limiter is not None and not self.limiter.try_acquire(candidates[next_index]):
+                        logger.info(f"Not hedging {candidates[next_index - 1]}: no rate-limit token for {candidates[next_index]}")
+                        hedge = False
+                        continue
+                    logger.info(f"Hedging {candidates[next_index - 1]} with {candidates[next_index]}")
+                    launch(acquired=self.limiter is not None)
+                    continue
+
+                for task in done:
+                    model = running.pop(task)
+                    if task.exception() is None:
+                        if model != candidates[0] and running:
+                            self.stats_for(model).hedges_won += 1
+                        return {"model_id": model, "result": task.result()}
+                    errors[model] = task.exception()
+                    logger.warning(f"LLM call to {model} failed: {task.exception()}")
+
+                if not running and next_index < len(candidates):
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+        raise LLMRoutingError(errors)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = dict(self._stats)
+        return {model_id: s.snapshot() for model_id, s in models.items()}
+
+
+def agent_model_route(db: Session, agent_id: str):
+    """
+    (model_id, equivalents) for an agent, from its profile's LLMModel and llm_fallbacks.
+    Returns (None, []) when the agent has no model configured.
+    """
+    profile = lsa_crud.get_agent_profile(db, agent_id)
+    if not profile or not profile.llm_model:
+        return None, []
+    agent_json = loads_json(profile.agent_json) if profile.agent_json else {}
+    fallbacks = [m for m in agent_json.get("llm_fallbacks", []) if lsa_crud.get_llm_by_id(db, m)]
+    return profile.llm_model.model_id, fallbacks
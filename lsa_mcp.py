@@ -0,0 +1,264 @@
+"""
+MCP client connection manager for LangGraph agents
+
+Keeps one pooled, initialized session per MCP server (HTTP keep-alive plus the server's
+Mcp-Session-Id), health-checks idle sessions with `ping` before reuse, and caches each
+server's tool list for a TTL. Tools for all of an agent's MCPTool rows are discovered
+in parallel.
+
+mcp_tool_json example:
+{
+    "name": "claims_server",
+    "url": "http://localhost:8931/mcp",
+    "headers": {"Authorization": "Bearer ..."}
+}
+"""
+import os
+import json
+import time
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.crud import lsa_crud
+from app.database.blob_codec import loads_json
+
+logger = logging.getLogger(__name__)
+
+MCP_PROTOCOL_VERSION = "2025-03-26"
+MCP_TOOLS_TTL_SECONDS = int(os.getenv("MCP_TOOLS_TTL_SECONDS", "300"))
+MCP_HEALTH_CHECK_SECONDS = int(os.getenv("MCP_HEALTH_CHECK_SECONDS", "30"))
+MCP_TIMEOUT_SECONDS = float(os.getenv("MCP_TIMEOUT_SECONDS", "10"))
+MCP_DISCOVERY_WORKERS = int(os.getenv("MCP_DISCOVERY_WORKERS", "8"))
+
+
+class MCPError(Exception):
+    """
+    Raised when an MCP server cannot be reached or returns a JSON-RPC error
+    """
+
+
+class MCPSession:
+    """
+    One initialized MCP session over streamable HTTP
+    """
+
+    def __init__(self, url: str, headers: Optional[dict] = None, timeout: float = MCP_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json, text/event-stream",
+            **(headers or {}),
+        }
+        self.session_id = None
+        self.last_ok = 0.0
+        self._next_id = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        # One keep-alive connection per session, reopened if the server closed it
+        if self._conn is None:
+            parts = urlsplit(self.url)
+            conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self._conn = conn_class(parts.netloc, timeout=self.timeout)
+        return self._conn
+
+    def _send(self, method: str, body: Optional[bytes] = None):
+        headers = dict(self.headers)
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        path = urlsplit(self.url).path or "/"
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response, response.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._conn = None
+                if attempt:
+                    raise MCPError(f"MCP server {self.url} unreachable: {e}") from e
+
+    def _post(self, payload: dict) -> Optional[dict]:
+        response, body = self._send("POST", json.dumps(payload).encode())
+        if response.status >= 400:
+            raise MCPError(f"MCP server {self.url} returned HTTP {response.status}")
+
+        if response.getheader("Mcp-Session-Id"):
+            self.session_id = response.getheader("Mcp-Session-Id")
+        if "id" not in payload or not body:
+            return None
+
+        try:
+            if (response.getheader("Content-Type") or "").startswith("text/event-stream"):
+                # Streamed reply: pick the JSON-RPC message answering this request
+                for line in body.decode().splitlines():
+                    if line.startswith("data:"):
+                        message = json.loads(line[5:].strip())
+                        if isinstance(message, dict) and message.get("id") == payload["id"]:
+                            return message
+                raise MCPError(f"MCP server {self.url} sent no reply for request {payload['id']}")
+            return json.loads(body)
+        except (UnicodeDecodeError, ValueError) as e:
+            raise MCPError(f"MCP server {self.url} sent invalid JSON: {e}") from e
+
+    def request(self, method: str, params: Optional[dict] = None) -> dict:
+        with self._lock:
+            self._next_id += 1
+            payload = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {}}
+            message = self._post(payload)
+        if not isinstance(message, dict):
+            raise MCPError(f"MCP server {self.url} sent an empty or malformed reply to {method}")
+        if message.get("error"):
+            raise MCPError(f"MCP {method} failed on {self.url}: {message['error'].get('message')}")
+        self.last_ok = time.monotonic()
+        return message.get("result") or {}
+
+    def notify(self, method: str, params: Optional[dict] = None):
+        with self._lock:
+            self._post({"jsonrpc": "2.0", "method": method, "params": params or {}})
+
+    def initialize(self):
+        self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "agent-builder", "version": "1.0"},
+        })
+        self.notify("notifications/initialized")
+
+    def ping(self) -> bool:
+        try:
+            self.request("ping")
+            return True
+        except MCPError:
+            return False
+
+    def list_tools(self) -> List[dict]:
+        tools, cursor = [], None
+        while True:
+            result = self.request("tools/list", {"cursor": cursor} if cursor else {})
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    def close(self):
+        with self._lock:
+            if self.session_id:
+                try:
+                    self._send("DELETE")
+                except MCPError:
+                    pass
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MCPConnectionManager:
+    """
+    Pooled sessions and cached tool lists, keyed by server URL and request headers
+    so servers reached with different credentials never share a session
+    """
+
+    def __init__(self, tools_ttl: int = MCP_TOOLS_TTL_SECONDS, health_check_seconds: int = MCP_HEALTH_CHECK_SECONDS):
+        self.tools_ttl = tools_ttl
+        self.health_check_seconds = health_check_seconds
+        self._sessions: Dict[str, MCPSession] = {}
+        self._tools: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._server_locks: Dict[str, threading.Lock] = {}
+
+    def _server_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._server_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _key(url: str, headers: Optional[dict]) -> str:
+        return f"{url} {json.dumps(headers or {}, sort_keys=True)}"
+
+    def get_session(self, url: str, headers: Optional[dict] = None) -> MCPSession:
+        """
+        Return a healthy session for url, reconnecting if the pooled one stopped answering
+        """
+        key = self._key(url, headers)
+        with self._server_lock(key):
+            session = self._sessions.get(key)
+            if session and time.monotonic() - session.last_ok > self.health_check_seconds:
+                if not session.ping():
+                    logger.warning(f"MCP session to {url} failed health check, reconnecting")
+                    session.close()
+                    session = None
+            if session is None:
+                session = MCPSession(url, headers)
+                session.initialize()
+                self._sessions[key] = session
+            return session
+
+    def list_tools(self, url: str, headers: Optional[dict] = None, refresh: bool = False) -> List[dict]:
+        """
+        Tool list/schemas for a server, served from cache within the TTL
+        """
+        key = self._key(url, headers)
+        cached = self._tools.get(key)
+        if cached and not refresh and cached[0] > time.monotonic():
+            return cached[1]
+
+        try:
+            tools = self.get_session(url, headers).list_tools()
+        except Exception:
+            # Drop the session so the next call reconnects from scratch
+            self.drop(url, headers)
+            raise
+        self._tools[key] = (time.monotonic() + self.tools_ttl, tools)
+        return tools
+
+    def drop(self, url: str, headers: Optional[dict] = None):
+        self._drop_key(self._key(url, headers))
+
+    def _drop_key(self, key: str):
+        with self._server_lock(key):
+            session = self._sessions.pop(key, None)
+            self._tools.pop(key, None)
+        if session:
+            session.close()
+
+    def close(self):
+        for key in list(self._sessions):
+            self._drop_key(key)
+
+    def discover_agent_tools(self, db: Session, agent_id: str) -> Dict[int, dict]:
+        """
+        Discover tools for every MCPTool row of an agent in parallel.
+        Returns {mcp_tool.id: {"server": url, "tools": [...]} or {"server": url, "error": str}}
+        """
+        definitions = {}
+        for row in lsa_crud.get_mcp_tools_by_agent(db, agent_id):
+            config = loads_json(row.mcp_tool_json)
+            definitions[row.id] = (config.get("url") or config.get("server_url"), config.get("headers") or {})
+
+        def discover(tool_id):
+            url, headers = definitions[tool_id]
+            if not url:
+                return tool_id, {"server": None, "error": "MCP tool has no server url"}
+            try:
+                return tool_id, {"server": url, "tools": self.list_tools(url, headers)}
+            except Exception as e:
+                # One bad server must not fail discovery for the others
+                logger.warning(f"MCP tool discovery failed for {url}: {e}")
+                return tool_id, {"server": url, "error": str(e)}
+
+        if not definitions:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(MCP_DISCOVERY_WORKERS, len(definitions))) as pool:
+            return dict(pool.map(discover, definitions))
+
+
+mcp_manager = MCPConnectionManager()
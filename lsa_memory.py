@@ -0,0 +1,318 @@
+"""
+Conversation memory for LangGraph agents
+
+Reads the agent's MemoryConfigModel row and keeps each conversation thread bounded:
+recent messages are kept verbatim inside a sliding window and a token budget, and
+older turns are folded into a running summary. Thread state is stored by a pluggable
+checkpointer (in-memory LRU or SQLite).
+
+memory_config_json example:
+{
+    "backend": "memory",            # "memory" or "sqlite"
+    "max_threads": 1000,            # LRU size for the in-memory backend
+    "sqlite_path": "agent_memory.db",
+    "window_messages": 20,          # most recent messages kept verbatim
+    "max_tokens": 4000,             # token budget for summary + recent messages
+    "summarize": true,              # fold evicted turns into a summary (else drop them)
+    "summary_max_tokens": 400
+}
+"""
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.database.crud import lsa_crud
+from app.database.blob_codec import dumps_json, loads_json
+
+Summarizer = Callable[[str, List[dict]], str]
+
+
+class MemoryConfig(BaseModel):
+    backend: str = "memory"
+    max_threads: int = 1000
+    sqlite_path: str = "agent_memory.db"
+    window_messages: int = 20
+    max_tokens: int = 4000
+    summarize: bool = True
+    summary_max_tokens: int = 400
+
+
+# ---------------------------------------------------------------------
+# Token counting
+# ---------------------------------------------------------------------
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count (~4 characters per token)
+    """
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = dumps_json(content).decode()
+    # a few tokens of per-message overhead for role and separators
+    return estimate_tokens(content) + 4
+
+
+def truncate_message(message: dict, max_tokens: int) -> dict:
+    """
+    Copy of message with its content cut to fit max_tokens (message overhead included)
+    """
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = dumps_json(content).decode()
+    marker = " ...[truncated]"
+    keep = max(0, (max_tokens - 4) * 4 - len(marker))
+    if len(content) <= keep:
+        return message
+    return {**message, "content": content[:keep] + marker}
+
+
+# ---------------------------------------------------------------------
+# Checkpointers
+# ---------------------------------------------------------------------
+class Checkpointer(ABC):
+    """
+    Stores per-thread state: {"summary": str, "messages": [...]}
+    """
+
+    @abstractmethod
+    def get(self, thread_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def put(self, thread_id: str, state: dict):
+        ...
+
+    @abstractmethod
+    def delete(self, thread_id: str):
+        ...
+
+    def close(self):
+        """
+        Release resources held by the store
+        """
+
+
+class InMemoryCheckpointer(Checkpointer):
+    """
+    Process-local store that keeps the max_threads most recently used threads
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._threads.get(thread_id)
+            if state is not None:
+                self._threads.move_to_end(thread_id)
+            return state
+
+    def put(self, thread_id: str, state: dict):
+        with self._lock:
+            self._threads[thread_id] = state
+            self._threads.move_to_end(thread_id)
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+    def delete(self, thread_id: str):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+
+class SQLiteCheckpointer(Checkpointer):
+    """
+    Durable store in a local SQLite file, shared by every worker on the host
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_memory ("
+            "thread_id TEXT PRIMARY KEY, state BLOB NOT NULL, "
+            "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM conversation_memory WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return loads_json(row[0]) if row else None
+
+    def put(self, thread_id: str, state: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversation_memory (thread_id, state, updated_at) "
+                "VALUES (?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(thread_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (thread_id, dumps_json(state))
+            )
+
+    def delete(self, thread_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_memory WHERE thread_id = ?", (thread_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------------------------------------------------------------
+# Summarization
+# ---------------------------------------------------------------------
+def extractive_summarizer(max_tokens: int) -> Summarizer:
+    """
+    Default summarizer that needs no model call: keeps the start of each evicted
+    message and drops the oldest lines once the summary is over max_tokens.
+    An LLM-backed summarizer with the same signature can be passed instead.
+    """
+    def summarize(previous: str, evicted: List[dict]) -> str:
+        lines = previous.splitlines() if previous else []
+        for message in evicted:
+            content = message.get("content") or ""
+            if not isinstance(content, str):
+                content = dumps_json(content).decode()
+            snippet = " ".join(content.split())[:200]
+            if snippet:
+                lines.append(f"{message.get('role', 'user')}: {snippet}")
+        while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    return summarize
+
+
+# ---------------------------------------------------------------------
+# Conversation memory
+# ---------------------------------------------------------------------
+class ConversationMemory:
+    """
+    Bounded history for every thread of one agent
+    """
+
+    def __init__(self, config: MemoryConfig, checkpointer: Checkpointer, summarizer: Optional[Summarizer] = None):
+        self.config = config
+        self.checkpointer = checkpointer
+        # The summary gets a fixed share of the budget so it can never crowd out recent turns
+        self.summary_tokens = min(config.summary_max_tokens, config.max_tokens // 2) if config.summarize else 0
+        self.summarizer = summarizer or extractive_summarizer(self.summary_tokens)
+
+    def _state(self, thread_id: str) -> dict:
+        return self.checkpointer.get(thread_id) or {"summary": "", "messages": []}
+
+    def _compact(self, summary: str, messages: List[dict]) -> Tuple[str, List[dict]]:
+        """
+        Evict the oldest messages until the window and token budget are met. The latest
+        user turn (and anything after it) is never evicted; when it alone is over the
+        budget its content is truncated instead.
+        """
+        evicted = []
+        budget = self.config.max_tokens - self.summary_tokens
+        total = sum(message_tokens(m) for m in messages)
+        # Messages before the latest user turn are the only ones that can be evicted
+        evictable = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=len(messages))
+        while evictable and (len(messages) > self.config.window_messages or total > budget):
+            message = messages.pop(0)
+            evictable -= 1
+            total -= message_tokens(message)
+            evicted.append(message)
+        # Never start the window with a tool result whose call was evicted
+        while evictable and messages[0].get("role") == "tool":
+            message = messages.pop(0)
+            evictable -= 1
+            total -= message_tokens(message)
+            evicted.append(message)
+        if total > budget and evictable < len(messages):
+            messages[evictable] = truncate_message(messages[evictable], message_tokens(messages[evictable]) - (total - budget))
+
+        if evicted and self.config.summarize:
+            summary = self.summarizer(summary, evicted)
+        return summary, messages
+
+    def append(self, thread_id: str, new_messages: List[dict]):
+        """
+        Record the messages of a new turn and compact the thread
+        """
+        state = self._state(thread_id)
+        summary, messages = self._compact(state["summary"], state["messages"] + list(new_messages))
+        self.checkpointer.put(thread_id, {"summary": summary, "messages": messages})
+
+    def load(self, thread_id: str) -> List[dict]:
+        """
+        Messages to send to the model: the summary (as a system message) plus recent turns
+        """
+        state = self._state(thread_id)
+        history = list(state["messages"])
+        if state["summary"]:
+            history.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{state['summary']}"
+            })
+        return history
+
+    def clear(self, thread_id: str):
+        self.checkpointer.delete(thread_id)
+
+
+def build_checkpointer(config: MemoryConfig) -> Checkpointer:
+    if config.backend == "sqlite":
+        return SQLiteCheckpointer(config.sqlite_path)
+    if config.backend == "memory":
+        return InMemoryCheckpointer(config.max_threads)
+    raise ValueError(f"Unknown memory backend '{config.backend}'. Must be one of: memory, sqlite")
+
+
+def _reuse_checkpointer(checkpointer: Checkpointer, config: MemoryConfig) -> bool:
+    """
+    Whether checkpointer can keep serving config; the in-memory store adopts the new max_threads
+    """
+    if config.backend == "sqlite":
+        return isinstance(checkpointer, SQLiteCheckpointer) and checkpointer.path == config.sqlite_path
+    if config.backend == "memory" and isinstance(checkpointer, InMemoryCheckpointer):
+        checkpointer.max_threads = config.max_threads
+        return True
+    return False
+
+
+_agent_memory: Dict[str, Tuple[object, Optional[Summarizer], ConversationMemory]] = {}
+_agent_memory_lock = threading.Lock()
+
+
+def get_agent_memory(db: Session, agent_id: str, summarizer: Optional[Summarizer] = None) -> ConversationMemory:
+    """
+    Memory for an agent, built from its MemoryConfigModel row (defaults when it has none).
+    Rebuilt when the row's updated_at or the summarizer changes. The thread store is kept
+    across rebuilds while the backend and path stay the same, and closed otherwise.
+    """
+    row = lsa_crud.get_memory_config(db, agent_id)
+    version = row.updated_at if row else None
+
+    with _agent_memory_lock:
+        cached = _agent_memory.get(agent_id)
+        if cached and cached[0] == version and cached[1] is summarizer:
+            return cached[2]
+
+        config = MemoryConfig(**loads_json(row.memory_config_json)) if row else MemoryConfig()
+        checkpointer = None
+        if cached:
+            previous = cached[2].checkpointer
+            if _reuse_checkpointer(previous, config):
+                checkpointer = previous
+            else:
+                previous.close()
+        memory = ConversationMemory(config, checkpointer or build_checkpointer(config), summarizer)
+        _agent_memory[agent_id] = (version, summarizer, memory)
+        return memory
@@ -2,10 +2,11 @@
 SQLAlchemy models for database tables
 """
 from datetime import datetime
-from sqlalchemy import Column, String, LargeBinary, DateTime, Integer, ForeignKey, Text, TIMESTAMP
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 
 from app.database.database import Base
+from app.database.blob_codec import CompressedJSONBlob
 
 
 class LLMProvider(Base):
@@ -14,6 +15,9 @@ class LLMProvider(Base):
 
     provider_id = Column(String, primary_key=True, index=True)
     provider_name = Column(String, nullable=False, unique=True)
+    # Client-side rate limit for all models of this provider (NULL = unlimited)
+    requests_per_minute = Column(Integer, nullable=True)
+    burst = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -23,11 +27,17 @@ class LLMProvider(Base):
 class LLMModel(Base):
     """LLM Model table — linked to provider"""
     __tablename__ = "llm_model"
+    __table_args__ = (
+        Index("ix_llm_model_provider_id_model_id", "provider_id", "model_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     model_id = Column(String, nullable=False, unique=True, index=True)
     model_name = Column(String, nullable=False)
     provider_id = Column(String, ForeignKey("llm_provider.provider_id"), nullable=False, index=True)
+    # Client-side rate limit for this model (NULL = unlimited)
+    requests_per_minute = Column(Integer, nullable=True)
+    burst = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -66,7 +76,7 @@ class LangGraphAgentProfile(Base):
     
     agent_id = Column(String, ForeignKey("langgraph_agent.agent_uuid"), primary_key=True, index=True)
     llm_model_id = Column(Integer, ForeignKey("llm_model.id"), nullable=True) 
-    agent_json = Column(LargeBinary, nullable=False)
+    agent_json = Column(CompressedJSONBlob, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -81,7 +91,7 @@ class MCPTool(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     agent_id = Column(String, ForeignKey("langgraph_agent.agent_uuid"), nullable=False, index=True)
-    mcp_tool_json = Column(LargeBinary, nullable=False)
+    mcp_tool_json = Column(CompressedJSONBlob, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -94,7 +104,7 @@ class MemoryConfigModel(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     agent_id = Column(String, ForeignKey("langgraph_agent.agent_uuid"), nullable=False, index=True)
-    memory_config_json = Column(LargeBinary, nullable=False)
+    memory_config_json = Column(CompressedJSONBlob, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
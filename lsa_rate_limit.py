@@ -0,0 +1,192 @@
+"""
+Client-side rate limiting for outbound LLM calls
+
+Token buckets keyed by provider_id and model_id, sized from the requests_per_minute and
+burst columns of LLMProvider / LLMModel (NULL means unlimited). A call waits for a token
+from its provider bucket and then its model bucket. While callers wait, tokens are
+handed out round-robin across agents, so one busy agent cannot starve the others, and
+the queue wait is recorded per bucket.
+"""
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database.crud import lsa_crud
+
+WAIT_WINDOW = 1000
+
+
+class FairTokenBucket:
+    """
+    Token bucket whose waiters are served round-robin by agent
+    """
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst or requests_per_minute))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self.acquired = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, wait_seconds: float):
+        self.acquired += 1
+        self._waits.append(wait_seconds * 1000)
+
+    async def acquire(self, agent_id: str = "default"):
+        """
+        Wait for a token. Returns the time spent waiting, in seconds.
+        """
+        self._refill()
+        if not self._queues and self.tokens >= 1:
+            self.tokens -= 1
+            self._record(0.0)
+            return 0.0
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(agent_id, deque()).append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+        wait = time.monotonic() - start
+        self._record(wait)
+        return wait
+
+    def available(self) -> bool:
+        """
+        Whether a token is free and nobody is queued for it
+        """
+        self._refill()
+        return not self._queues and self.tokens >= 1
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is available, without waiting
+        """
+        if not self.available():
+            return False
+        self.tokens -= 1
+        self._record(0.0)
+        return True
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        # Take the head of the first agent's queue, then rotate that agent to the back
+        while self._queues:
+            agent_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(agent_id)
+            else:
+                del self._queues[agent_id]
+            if not waiter.done():
+                return waiter
+        return None
+
+    async def _dispatch(self):
+        while self._queues:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            waiter = self._next_waiter()
+            if waiter is not None:
+                self.tokens -= 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "requests_per_minute": round(self.rate * 60),
+            "burst": int(self.capacity),
+            "acquired": self.acquired,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_agents": len(self._queues),
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+            "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+        }
+
+
+class LLMRateLimiter:
+    """
+    Provider and model buckets, loaded from the LLMProvider / LLMModel rows
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, FairTokenBucket] = {}
+        self._models: Dict[str, Tuple[str, Optional[FairTokenBucket]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        """
+        (Re)build the buckets from the database; call again after limits change
+        """
+        buckets, models = {}, {}
+        for provider in lsa_crud.get_all_providers(db):
+            if provider.requests_per_minute:
+                buckets[f"provider:{provider.provider_id}"] = self._bucket(
+                    f"provider:{provider.provider_id}", provider.requests_per_minute, provider.burst
+                )
+            for llm in lsa_crud.get_llms_by_provider(db, provider.provider_id):
+                model_bucket = None
+                if llm.requests_per_minute:
+                    model_bucket = self._bucket(f"model:{llm.model_id}", llm.requests_per_minute, llm.burst)
+                    buckets[f"model:{llm.model_id}"] = model_bucket
+                models[llm.model_id] = (provider.provider_id, model_bucket)
+        with self._lock:
+            self._buckets, self._models = buckets, models
+
+    def _bucket(self, key: str, requests_per_minute: int, burst: Optional[int]) -> FairTokenBucket:
+        # Keep an existing bucket (and its queue) when its limits did not change
+        existing = self._buckets.get(key)
+        if existing and round(existing.rate * 60) == requests_per_minute and existing.capacity == max(1, burst or requests_per_minute):
+            return existing
+        return FairTokenBucket(requests_per_minute, burst)
+
+    async def acquire(self, model_id: str, agent_id: str = "default") -> float:
+        """
+        Wait for the provider and model limits of model_id. Returns total wait in seconds.
+        """
+        with self._lock:
+            provider_id, model_bucket = self._models.get(model_id, (None, None))
+            provider_bucket = self._buckets.get(f"provider:{provider_id}")
+        wait = 0.0
+        for bucket in (provider_bucket, model_bucket):
+            if bucket is not None:
+                wait += await bucket.acquire(agent_id)
+        return wait
+
+    def try_acquire(self, model_id: str) -> bool:
+        """
+        Take the provider and model tokens for model_id only if both are free right now.
+        Used for optional calls such as hedges, which should not queue behind real traffic.
+        """
+        with self._lock:
+            provider_id, model_bucket = self._models.get(model_id, (None, None))
+            provider_bucket = self._buckets.get(f"provider:{provider_id}")
+        buckets = [b for b in (provider_bucket, model_bucket) if b is not None]
+        if not all(bucket.available() for bucket in buckets):
+            return False
+        for bucket in buckets:
+            bucket.try_acquire()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.stats() for key, bucket in buckets.items()}
+
+
+llm_rate_limiter = LLMRateLimiter()
@@ -0,0 +1,128 @@
+"""
+Result cache for idempotent agent tools
+
+Tools that read slowly-changing Snowflake resources (Cortex Analyst SQL, Cortex Search)
+can opt in through the `tool_cache` block of tool.yaml, written by the builder's add_tool:
+
+    tool_cache:
+      sales_analyst:
+        enabled: true
+        ttl_seconds: 600
+        max_entries: 256
+        max_bytes: 8388608
+
+Results are keyed on the tool name plus its arguments as canonical JSON (sorted keys,
+unset arguments dropped), so a repeated question skips the warehouse until the entry
+expires. Only successful results are stored.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def tool_key(tool_name: str, args: Optional[dict]) -> str:
+    """
+    Canonical key of a tool call: tool name plus its arguments as sorted, compact JSON
+    """
+    args = {k: v for k, v in (args or {}).items() if v is not None}
+    return json.dumps([tool_name, args], sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results with a per-entry TTL, bounded by entry count and total bytes
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self._items: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._bytes -= entry[2]
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, content: str):
+        size = len(content.encode())
+        # A single result larger than the whole budget is never cached
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._items[key] = (time.monotonic() + self.ttl_seconds, content, size)
+            self._bytes += size
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def build_tool_caches(settings: Optional[Dict[str, dict]]) -> Dict[str, ToolResultCache]:
+    """
+    One cache per tool that opted in, from a `tool_cache` block
+    """
+    caches = {}
+    for tool_name, cache in (settings or {}).items():
+        if cache and cache.get("enabled", True):
+            caches[tool_name] = ToolResultCache(
+                ttl_seconds=cache.get("ttl_seconds") or DEFAULT_TTL_SECONDS,
+                max_entries=cache.get("max_entries") or DEFAULT_MAX_ENTRIES,
+                max_bytes=cache.get("max_bytes") or DEFAULT_MAX_BYTES,
+            )
+    return caches
+
+
+def load_tool_cache_settings(agent_name_folder: str) -> Dict[str, dict]:
+    """
+    The `tool_cache` block of the agent's tool.yaml ({} when there is none)
+    """
+    import yaml
+
+    tool_yaml_path = os.path.join(agent_name_folder, "tool.yaml")
+    if not os.path.exists(tool_yaml_path):
+        return {}
+    with open(tool_yaml_path, "r") as f:
+        return (yaml.safe_load(f) or {}).get("tool_cache") or {}
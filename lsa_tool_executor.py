@@ -0,0 +1,147 @@
+"""
+Parallel tool-call execution for LangGraph agents
+
+When a model turn emits several tool calls (e.g. Cortex Analyst and Cortex Search),
+they are independent of each other and run concurrently, bounded by a global
+concurrency cap and a per-tool timeout. Results come back in the original call order
+so the transcript is deterministic regardless of which tool finished first.
+
+Tools that opted in through the `tool_cache` block of tool.yaml (see lsa_tool_cache)
+are answered from their result cache when the same call was made recently.
+
+A sync tool runs in a worker thread, which cannot be stopped when it times out; its
+concurrency slot stays taken until the thread actually returns, so abandoned calls
+cannot pile up past the cap.
+
+tool_calls example (the shape LangChain puts on an AIMessage):
+[
+    {"id": "call_1", "name": "sales_analyst", "args": {"query": "revenue by region"}},
+    {"id": "call_2", "name": "docs_search", "args": {"query": "refund policy"}}
+]
+"""
+import os
+import time
+import asyncio
+import inspect
+import logging
+import functools
+import contextvars
+from typing import Any, Callable, Dict, List, Optional
+
+from app.database.blob_codec import dumps_json
+from app.services.lsa_tool_cache import build_tool_caches, tool_key
+
+logger = logging.getLogger(__name__)
+
+TOOL_MAX_CONCURRENCY = int(os.getenv("LSA_TOOL_MAX_CONCURRENCY", "8"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("LSA_TOOL_TIMEOUT_SECONDS", "60"))
+
+
+def _content(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    return dumps_json(result).decode()
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls of one model turn concurrently.
+    tools maps tool name -> callable(**args); sync callables run in a worker thread.
+    tool_cache holds the per-tool result cache settings from tool.yaml.
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, Callable],
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+        timeout: float = TOOL_TIMEOUT_SECONDS,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        tool_cache: Optional[Dict[str, dict]] = None
+    ):
+        self.tools = tools
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        # tool_cache is the tool.yaml block: {tool name: {enabled, ttl_seconds, ...}}
+        self.caches = build_tool_caches(tool_cache)
+        # Shared by every turn, so concurrent conversations also respect the cap
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _thread_done(self, future: asyncio.Future):
+        # Retrieve the outcome so a thread that outlived its timeout does not log
+        # "exception was never retrieved", then free its slot
+        if not future.cancelled():
+            future.exception()
+        self._semaphore.release()
+
+    def _start(self, fn: Callable, args: dict):
+        """
+        Awaitable for one tool call, and whether it releases its own slot when done
+        """
+        if inspect.iscoroutinefunction(fn):
+            return fn(**args), False
+        context = contextvars.copy_context()
+        future = asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, fn, **args))
+        future.add_done_callback(self._thread_done)
+        # shield: a timeout must not detach the future from the thread still running it
+        return asyncio.shield(future), True
+
+    async def _run_one(self, call: dict) -> dict:
+        name = call.get("name")
+        message = {"role": "tool", "tool_call_id": call.get("id"), "name": name}
+        fn = self.tools.get(name)
+        if fn is None:
+            return {**message, "status": "error", "content": f"Unknown tool '{name}'"}
+
+        args = call.get("args") or {}
+        cache = self.caches.get(name)
+        key = tool_key(name, args) if cache is not None else None
+        if cache is not None:
+            content = cache.get(key)
+            if content is not None:
+                return {**message, "status": "success", "content": content, "cached": True, "duration_ms": 0.0}
+
+        timeout = self.tool_timeouts.get(name, self.timeout)
+        await self._semaphore.acquire()
+        releases_itself = False
+        start = time.perf_counter()
+        try:
+            work, releases_itself = self._start(fn, args)
+            result = await asyncio.wait_for(work, timeout)
+            message.update(status="success", content=_content(result))
+            if cache is not None:
+                cache.put(key, message["content"])
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {name} timed out after {timeout}s")
+            message.update(status="error", content=f"Tool '{name}' timed out after {timeout} seconds")
+        except Exception as e:
+            logger.exception(f"Tool {name} failed")
+            message.update(status="error", content=f"Tool '{name}' failed: {e}")
+        finally:
+            if not releases_itself:
+                self._semaphore.release()
+        message["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return message
+
+    def cache_stats(self) -> dict:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    async def run(self, tool_calls: List[dict]) -> List[dict]:
+        """
+        Execute tool_calls concurrently; one tool message per call, in call order.
+        A failing or timed-out tool yields an error message instead of failing the turn.
+        """
+        if not tool_calls:
+            return []
+        return list(await asyncio.gather(*(self._run_one(call) for call in tool_calls)))
+
+
+def make_tool_node(executor: ToolExecutor) -> Callable:
+    """
+    LangGraph node that executes the tool calls of the last message in state["messages"]
+    """
+    async def tool_node(state: dict) -> dict:
+        last = state["messages"][-1]
+        tool_calls = last.get("tool_calls") if isinstance(last, dict) else getattr(last, "tool_calls", None)
+        return {"messages": await executor.run(tool_calls or [])}
+
+    return tool_node
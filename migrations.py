@@ -0,0 +1,257 @@
+"""
+Versioned schema migrations
+
+Each migration is applied once, in order, and recorded in the schema_version table.
+Migrations must be idempotent (checkfirst / inspector checks) because databases created
+before this module existed already have some of the objects.
+
+Workers check the stamp with a single query at boot and skip DDL and seeding when the
+database is current. Otherwise one worker takes the migration lock (a file lock for
+SQLite, an advisory lock on PostgreSQL / MySQL) and migrates while the others wait.
+
+    python -m app.database.migrations upgrade
+    python -m app.database.migrations check-plans    # SQLite: hot queries must use indexes
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.database.database import Base
+
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+    extend_existing=True,
+)
+
+
+# ---------------------------------------------------------------------
+# Migrations
+# ---------------------------------------------------------------------
+def _baseline(conn: Connection):
+    """
+    Tables as declared by the models
+    """
+    from app.database.data_classes import ssa_models, lsa_models  # Import here to avoid circular import
+    Base.metadata.create_all(bind=conn)
+
+
+def _add_columns(conn: Connection, table: str, columns: List[Tuple[str, str]]):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name, ddl_type in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+
+
+def _llm_rate_limits(conn: Connection):
+    """
+    requests_per_minute / burst on llm_provider and llm_model
+    """
+    for table in ("llm_provider", "llm_model"):
+        _add_columns(conn, table, [("requests_per_minute", "INTEGER"), ("burst", "INTEGER")])
+
+
+def _create_indexes(*names: str) -> Callable[[Connection], None]:
+    def migrate(conn: Connection):
+        from app.database.data_classes import ssa_models, lsa_models  # Import here to avoid circular import
+        indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+        for name in names:
+            indexes[name].create(bind=conn, checkfirst=True)
+    return migrate
+
+
+def _seed_defaults(conn: Connection):
+    """
+    Default users, Snowflake Cortex LLMs and LangGraph providers/models
+    """
+    from app.database.crud import lsa_crud, ssa_llm, user
+    # Session commits are nested inside the migration's transaction
+    db = Session(bind=conn)
+    try:
+        user.init_user(db)
+        ssa_llm.init_default_llms(db)
+        lsa_crud.init_default_providers(db)
+        lsa_crud.init_default_llms_by_provider(db)
+    finally:
+        db.close()
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline tables", _baseline),
+    (2, "llm rate limit columns", _llm_rate_limits),
+    (3, "composite indexes for hot lookups", _create_indexes(
+        "ix_tool_details_agent_id_created_at",
+        "ix_user_session_user_id_expires_at",
+        "ix_llm_model_provider_id_model_id",
+    )),
+    (4, "seed default data", _seed_defaults),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+MIGRATION_LOCK_KEY = 0x5C4E3A01
+
+
+# ---------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------
+def current_version(conn: Connection) -> int:
+    """
+    Highest applied migration, 0 for a database that was never migrated
+    """
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def schema_is_current(engine: Engine) -> bool:
+    """
+    Cheap boot-time check: one query against the stamp, no reflection
+    """
+    try:
+        with engine.connect() as conn:
+            return (conn.execute(select(func.max(schema_version.c.version))).scalar() or 0) >= LATEST_VERSION
+    except DBAPIError:
+        # schema_version does not exist yet
+        return False
+
+
+@contextmanager
+def migration_lock(engine: Engine):
+    """
+    Hold a lock that only one process at a time can own while migrating
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        database = engine.url.database
+        if not database or database == ":memory:":
+            yield
+            return
+        import fcntl
+        with open(f"{os.path.abspath(database)}.migrate.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    elif dialect == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    elif dialect in ("mysql", "mariadb"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT GET_LOCK('schema_migration', 600)"))
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT RELEASE_LOCK('schema_migration')"))
+    else:
+        yield
+
+
+def ensure_schema(engine: Engine) -> List[int]:
+    """
+    Migrate unless the database is already current. Returns the versions applied
+    by this process (empty when another worker did it, or nothing was pending).
+    """
+    if schema_is_current(engine):
+        return []
+    with migration_lock(engine):
+        # Another worker may have finished while we waited for the lock
+        if schema_is_current(engine):
+            return []
+        return upgrade(engine)
+
+
+def upgrade(engine: Engine) -> List[int]:
+    """
+    Apply pending migrations, each in its own transaction. Returns the versions applied.
+    """
+    schema_version.create(bind=engine, checkfirst=True)
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if version <= current_version(conn):
+                continue
+            migrate(conn)
+            conn.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+# ---------------------------------------------------------------------
+# Query plan check (SQLite)
+# ---------------------------------------------------------------------
+HOT_QUERIES = {
+    "tools by agent": (
+        "SELECT * FROM tool_details WHERE agent_id = :v ORDER BY created_at",
+        "ix_tool_details_agent_id_created_at",
+    ),
+    "active user by email": (
+        "SELECT * FROM users WHERE email = :v AND date_expired IS NULL",
+        "ix_users_email",
+    ),
+    "sessions by user": (
+        "SELECT * FROM user_session WHERE user_id = :v AND expires_at > CURRENT_TIMESTAMP",
+        "ix_user_session_user_id_expires_at",
+    ),
+    "llms by provider": (
+        "SELECT * FROM llm_model WHERE provider_id = :v ORDER BY model_id",
+        "ix_llm_model_provider_id_model_id",
+    ),
+}
+
+
+def check_query_plans(engine: Engine) -> List[str]:
+    """
+    EXPLAIN QUERY PLAN for each hot query on SQLite.
+    Returns a list of failures (queries not using their expected index).
+    """
+    failures = []
+    with engine.connect() as conn:
+        for label, (sql, index_name) in HOT_QUERIES.items():
+            plan = " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), {"v": "x"}))
+            # A temp b-tree means the index did not also satisfy the ORDER BY
+            if index_name not in plan or "TEMP B-TREE" in plan:
+                failures.append(f"{label}: expected {index_name}, plan was: {plan}")
+    return failures
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    from app.database.database import engine
+
+    if argv[:1] == ["upgrade"]:
+        applied = upgrade(engine)
+        print(f"Applied migrations: {applied}" if applied else f"Schema is current (version {LATEST_VERSION})")
+        return 0
+    if argv[:1] == ["check-plans"]:
+        if engine.dialect.name != "sqlite":
+            print("check-plans only supports SQLite")
+            return 2
+        failures = check_query_plans(engine)
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if not failures:
+            print(f"OK: {len(HOT_QUERIES)} hot queries use their indexes")
+        return 1 if failures else 0
+
+    print("usage: python -m app.database.migrations [upgrade | check-plans]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Snowflake agent integration, loaded on first use
+"""
+import os
+import threading
+
+CA_BUNDLE_PATH = "agentbuilderbe/source/certs/cacert.pem"
+
+
+class SnowflakeAgentProvider:
+    """
+    Creates agents in Snowflake through the template's agent_builder.
+    The Snowflake/HTTP stack is imported the first time an agent is created,
+    so workers that never call it do not pay for loading it.
+    """
+
+    def __init__(self):
+        self._create_agent = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._create_agent is None:
+            with self._lock:
+                if self._create_agent is None:
+                    os.environ['REQUESTS_CA_BUNDLE'] = CA_BUNDLE_PATH
+                    from templates.ssa_template.source.agent_builder import create_agent
+                    self._create_agent = create_agent
+        return self._create_agent
+
+    def create_agent(self, agent_name: str):
+        """
+        Returns (success, agent_url)
+        """
+        return self._load()(agent_name)
+
+
+snowflake_agent_provider = SnowflakeAgentProvider()
+
+
+def get_snowflake_agent_provider() -> SnowflakeAgentProvider:
+    """
+    Dependency to get the Snowflake agent provider
+    """
+    return snowflake_agent_provider
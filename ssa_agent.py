@@ -1,12 +1,13 @@
 """
 CRUD operations for agents
 """
-import json
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, Iterator
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app.database.data_classes.ssa_models import UserAgent, AgentDetails
+from app.database.data_classes.ssa_models import UserAgent, AgentDetails, ToolDetails
+from app.database.blob_codec import dumps_json, loads_json
 from app.api.schemas.ssa_api_schemas import AgentCreate, AgentConfig
 
 
@@ -36,7 +37,7 @@ def create_agent_details(db: Session, agent_uuid: str, details: AgentConfig) ->
     """
     Create or update agent details
     """
-    agent_json = json.dumps(details.model_dump(by_alias=True)).encode()
+    agent_json = dumps_json(details.model_dump(by_alias=True))
     
     # Check if details already exist
     existing = db.query(AgentDetails).filter(AgentDetails.agent_id == agent_uuid).first()
@@ -59,6 +60,69 @@ def create_agent_details(db: Session, agent_uuid: str, details: AgentConfig) ->
         return db_details
     
 
+def _agent_rows(user_id: str, agent_uuid: str, agent_json: dict, tools: List[dict]) -> list:
+    rows = [
+        UserAgent(agent_uuid=agent_uuid, user_id=user_id),
+        AgentDetails(agent_id=agent_uuid, agent_json=dumps_json(agent_json))
+    ]
+    rows.extend(
+        ToolDetails(agent_id=agent_uuid, tool_json=dumps_json(tool))
+        for tool in tools
+    )
+    return rows
+
+
+def bulk_create_agents(
+    db: Session,
+    user_id: str,
+    agents: List[Tuple[str, dict, List[dict]]],
+    batch_size: int = 100
+) -> Dict[str, Optional[str]]:
+    """
+    Create agents with their details and tools, committing batch_size agents per transaction.
+    agents is a list of (agent_uuid, agent_json, tool_jsons).
+    If a batch fails its agents are retried one by one so a bad row only fails itself.
+    Returns {agent_uuid: error message or None}
+    """
+    results = {}
+    for start in range(0, len(agents), batch_size):
+        batch = agents[start:start + batch_size]
+        try:
+            for agent_uuid, agent_json, tools in batch:
+                db.add_all(_agent_rows(user_id, agent_uuid, agent_json, tools))
+            db.commit()
+            results.update({agent_uuid: None for agent_uuid, _, _ in batch})
+            continue
+        except Exception:
+            db.rollback()
+
+        for agent_uuid, agent_json, tools in batch:
+            try:
+                db.add_all(_agent_rows(user_id, agent_uuid, agent_json, tools))
+                db.commit()
+                results[agent_uuid] = None
+            except Exception as e:
+                db.rollback()
+                results[agent_uuid] = str(e.__cause__ or e)
+    return results
+
+
+def delete_agents(db: Session, agent_uuids: List[str]):
+    """
+    Delete the user_agent, agent_details and tool_details rows of agents in one transaction
+    """
+    if not agent_uuids:
+        return
+    try:
+        db.query(ToolDetails).filter(ToolDetails.agent_id.in_(agent_uuids)).delete(synchronize_session=False)
+        db.query(AgentDetails).filter(AgentDetails.agent_id.in_(agent_uuids)).delete(synchronize_session=False)
+        db.query(UserAgent).filter(UserAgent.agent_uuid.in_(agent_uuids)).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
 # For future use
 def get_agents_by_user(db: Session, user_id: str) -> List[UserAgent]:
     """
@@ -67,6 +131,23 @@ def get_agents_by_user(db: Session, user_id: str) -> List[UserAgent]:
     return db.query(UserAgent).filter(UserAgent.user_id == user_id).all()
 
 
+def iter_agent_uuids_by_user(db: Session, user_id: str, page_size: int = 500) -> Iterator[str]:
+    """
+    Yield agent UUIDs of a user page by page (keyset pagination),
+    so callers can walk thousands of agents without loading them all
+    """
+    last_uuid = None
+    while True:
+        query = db.query(UserAgent.agent_uuid).filter(UserAgent.user_id == user_id)
+        if last_uuid is not None:
+            query = query.filter(UserAgent.agent_uuid > last_uuid)
+        page = [row.agent_uuid for row in query.order_by(UserAgent.agent_uuid).limit(page_size).all()]
+        yield from page
+        if len(page) < page_size:
+            return
+        last_uuid = page[-1]
+
+
 # For future use
 def get_all_agents(db: Session, skip: int = 0, limit: int = 100) -> List[UserAgent]:
     """
@@ -81,10 +162,26 @@ def get_agent_details(db: Session, agent_uuid: str) -> Optional[dict]:
     """
     details = db.query(AgentDetails).filter(AgentDetails.agent_id == agent_uuid).first()
     if details:
-        return json.loads(details.agent_json.decode())
+        return loads_json(details.agent_json)
     return None
 
 
+def get_agent_version(db: Session, agent_uuid: str) -> Optional[str]:
+    """
+    Cache version of an agent's details and tools: changes whenever the details row
+    is updated or a tool is added or removed. None when the agent has no details.
+    One indexed query, so a cache hit costs less than loading details and tools.
+    """
+    row = db.query(AgentDetails.updated_at, func.count(ToolDetails.id), func.max(ToolDetails.id)) \
+        .outerjoin(ToolDetails, ToolDetails.agent_id == AgentDetails.agent_id) \
+        .filter(AgentDetails.agent_id == agent_uuid) \
+        .group_by(AgentDetails.agent_id, AgentDetails.updated_at).first()
+    if row is None or row[0] is None:
+        return None
+    updated_at, tool_count, last_tool_id = row
+    return f"{updated_at.isoformat()}:{tool_count}:{last_tool_id}"
+
+
 # For future use
 def delete_agent(db: Session, agent_uuid: str) -> bool:
     """
@@ -2,22 +2,20 @@
 Agent endpoints
 """
 import os
-
-if not os.getenv('REQUESTS_CA_BUNDLE'):
-    os.environ['REQUESTS_CA_BUNDLE'] = "agentbuilderbe/source/certs/cacert.pem"
-
-os.environ['REQUESTS_CA_BUNDLE'] = "agentbuilderbe/source/certs/cacert.pem"
-
+import json
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import logging
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db
+from app.database.database import ReadSessionLocal
 from app.database.crud import ssa_agent as agent_crud
 from app.database.crud import ssa_tool as tool_crud
+from app.database.crud import ssa_session as session_crud
 from app.api.schemas.ssa_api_schemas import (
     AgentCreate,
     AgentResponse,
@@ -33,22 +31,45 @@ from app.api.schemas.ssa_api_schemas import (
     AgentConfigCreateRequest,
     AgentConfigCreateResponse
 )
-from app.utils.file_manager import (
-    copy_template_to_agent_folder,
-    create_agent_zip,
-    cleanup_zip
+from app.utils.file_manager import copy_template_to_agent_folder
+from app.utils.zip_stream import stream_zip, iter_folder
+from app.utils.agent_paths import (
+    agent_dir,
+    adopt_agent_dir,
+    ensure_agent_dir,
+    forget_agent_dir,
+    resolve_agent_dir
 )
-from app.utils.yaml_generator import create_agent_yaml
+from app.utils.two_tier_cache import get_shared_cache
+from app.utils.yaml_generator import create_agent_yaml, update_tool_yaml
 from app.utils.template_renderer import write_rendered_template
-from app.config import SSA_AGENTS_DIR, SSA_TEMPLATE_DIR, USERNAME, PASSWORD
+from app.api.schemas.ssa_bulk_schemas import (
+    BulkAgentDefinition,
+    BulkAgentImportRequest,
+    BulkAgentImportResponse,
+    BulkAgentResult
+)
+from app.utils.snowflake_provider import SnowflakeAgentProvider, get_snowflake_agent_provider
+from app.config import SSA_TEMPLATE_DIR, USERNAME, PASSWORD
 # from agent_builder_deploy.my_service_deploy import deploy
-from templates.ssa_template.source.agent_builder import create_agent
-import os
 import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "100"))
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", "8"))
+
+
+@router.on_event("startup")
+def start_session_sweeper():
+    session_crud.start_session_sweeper()
+
+
+@router.on_event("shutdown")
+def stop_session_sweeper():
+    session_crud.stop_session_sweeper()
+
 
 @router.post("/create", response_model=AgentResponse)
 def create_snowflake_agent(
@@ -86,11 +107,15 @@ def configure_agent(
         # if not agent:
         #     raise HTTPException(status_code=404, detail="Agent not found")
         
+        # Reject unknown or expired sessions (looked up in the session cache first)
+        if details.sesn_id and not session_crud.get_session(db, details.sesn_id):
+            raise HTTPException(status_code=401, detail="Session not found or expired")
+
         # Extract agent name
         agent_name = details.agent_name.lower().replace(" ", "_") if details.agent_name else "default_agent"
         
-        # Copy template folder and rename to agent_name
-        agent_folder = copy_template_to_agent_folder(agent_uuid, agent_name)
+        # Copy template folder and rename to agent_name, then move it into its shard
+        agent_folder = adopt_agent_dir(agent_uuid, copy_template_to_agent_folder(agent_uuid, agent_name))
         
         # Save to database
         # agent_crud.create_agent_details(db, agent_uuid, details)
@@ -129,13 +154,13 @@ def configure_agent(
 @router.get("/{agent_uuid}/download")
 def download_agent(
     agent_uuid: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     a. Download agent code as ZIP
-    b. Create zip
-    c. Return zip file
-    d. Cleanup handled by background task
+    b. Stream the agent folder as a zip, nothing is staged on disk
+    c. Entries are the agent folder's files relative to the folder (source/..., app.yaml),
+       with no top-level directory
     """
     try:
         # Verify agent exists
@@ -144,22 +169,18 @@ def download_agent(
             raise HTTPException(status_code=404, detail="Agent not found")
         
         # Check if agent folder exists
-        agent_folder = os.path.join(SSA_AGENTS_DIR, agent_uuid)
-        if not os.path.exists(agent_folder):
+        agent_folder = resolve_agent_dir(agent_uuid)
+        if agent_folder is None:
             raise HTTPException(
                 status_code=400,
                 detail="Agent not configured yet. Please configure the agent first."
             )
         
-        # Create zip file
-        zip_path = create_agent_zip(agent_uuid)
-        
-        # Return zip file with cleanup
-        return FileResponse(
-            zip_path,
-            media_type='application/zip',
-            filename=f"agent_{agent_uuid}.zip",
-            background=lambda: cleanup_zip(zip_path)
+        # Return zip stream
+        return StreamingResponse(
+            stream_zip(iter_folder(agent_folder, "")),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="agent_{agent_uuid}.zip"'}
         )
     
     except HTTPException:
@@ -168,6 +189,124 @@ def download_agent(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/users/{user_id}/export")
+def export_user_agents(
+    user_id: str,
+    db: Session = Depends(get_read_db)
+):
+    """
+    a. Stream one ZIP with every agent of a user
+    b. Each agent gets <agent_uuid>/config.json (DB configuration) and
+       <agent_uuid>/files/... (its agent folder)
+    c. Files are read and compressed incrementally, nothing is staged on disk
+    """
+    try:
+        if not next(agent_crud.iter_agent_uuids_by_user(db, user_id, page_size=1), None):
+            raise HTTPException(status_code=404, detail="No agents found for user")
+
+        def entries():
+            # The request's session is closed once the handler returns, so the
+            # stream uses its own
+            stream_db = ReadSessionLocal()
+            try:
+                for agent_uuid in agent_crud.iter_agent_uuids_by_user(stream_db, user_id):
+                    config = {
+                        "agent_uuid": agent_uuid,
+                        "user_id": user_id,
+                        "agent_details": agent_crud.get_agent_details(stream_db, agent_uuid),
+                        "tools": tool_crud.get_tools_by_agent(stream_db, agent_uuid)
+                    }
+                    yield f"{agent_uuid}/config.json", json.dumps(config, indent=2, default=str).encode()
+
+                    agent_folder = resolve_agent_dir(agent_uuid)
+                    if agent_folder is not None:
+                        yield from iter_folder(agent_folder, f"{agent_uuid}/files")
+            finally:
+                stream_db.close()
+
+        return StreamingResponse(
+            stream_zip(entries()),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="agents_{user_id}.zip"'}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def render_runtime_files(agent_uuid: str, config: AgentRuntimeConfig):
+    """
+    Render app.yaml and the <AGENT>_AGENT.py runtime file into the agent folder.
+    Returns (app.yaml path, agent file path)
+    """
+    # Prepare path and name
+    agent_folder = ensure_agent_dir(agent_uuid)
+    agent_name = config.agent_name.lower().replace(" ", "_") if config.agent_name else "default_agent"
+    db_dev = config.db
+    db_sit = config.db.replace("D01","T01")
+    db_uat = config.db.replace("D01","U01")
+    db_preprod = config.db.replace("D01","U01")
+    db_prod = config.db.replace("D01","P01")
+    yaml_replacements = {
+        "agent_name": agent_name.upper(),
+        "db_dev": db_dev,
+        "db_sit": db_sit,
+        "db_uat": db_uat,
+        "db_preprod": db_preprod,
+        "db_prod": db_prod,
+        "schema": config.schema
+    }
+
+    output_yaml_path = write_rendered_template(
+        template_dir=os.path.join(SSA_TEMPLATE_DIR, "source", "cao"),
+        agent_folder=agent_folder,
+        agent_name=agent_name,
+        replacements=yaml_replacements,
+        template_file="app.yaml",
+        output_file="app.yaml",
+    )
+
+    # Replacements dictionary
+    replacements = {
+        "agent_name": agent_name.upper(),
+        "application_name": str(config.application_name),
+        "user_identity": str(config.user_identity),
+        # "db": str(config.db),
+        # "schema": str(config.schema)
+    }
+
+    # Use utility to render and write the agent file
+    target_path = write_rendered_template(
+        template_dir=os.path.join(SSA_TEMPLATE_DIR, "source", "cao"),
+        agent_folder=agent_folder,
+        agent_name=agent_name,
+        replacements=replacements,
+        template_file="CAO_AGENT.py",
+        output_file=f"{agent_name.upper()}_AGENT.py",
+    )
+
+    # replacements = {
+    #     "agent_name": agent_name.upper(),
+    #     "application_name": str(config.application_name)
+    #     # "db": str(config.db),
+    #     # "schema": str(config.schema)
+    # }
+
+    # # Use utility to render and write the agent file
+    # target_path = write_rendered_template(
+    #     template_dir=os.path.join(SSA_TEMPLATE_DIR, "source"),
+    #     agent_folder=agent_folder,
+    #     agent_name=agent_name,
+    #     replacements=replacements,
+    #     template_file="cao_fastapi.py",
+    #     output_file=f"{config.application_name.lower()}_fastapi.py",
+    # )
+
+    return output_yaml_path, target_path
+
+
 @router.post("/{agent_uuid}/runtime-configure", response_model=MessageResponse)
 def configure_agent_runtime(
     agent_uuid: str,
@@ -184,68 +323,7 @@ def configure_agent_runtime(
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
 
-        # Prepare path and name
-        agent_folder = os.path.join(SSA_AGENTS_DIR, agent_uuid)
-        agent_name = config.agent_name.lower().replace(" ", "_") if config.agent_name else "default_agent"
-        db_dev = config.db
-        db_sit = config.db.replace("D01","T01")
-        db_uat = config.db.replace("D01","U01")
-        db_preprod = config.db.replace("D01","U01")
-        db_prod = config.db.replace("D01","P01")
-        yaml_replacements = {
-            "agent_name": agent_name.upper(),
-            "db_dev": db_dev,
-            "db_sit": db_sit,
-            "db_uat": db_uat,
-            "db_preprod": db_preprod,
-            "db_prod": db_prod,
-            "schema": config.schema
-        }
-
-        output_yaml_path = write_rendered_template(
-            template_dir=os.path.join(SSA_TEMPLATE_DIR, "source", "cao"),
-            agent_folder=agent_folder,
-            agent_name=agent_name,
-            replacements=yaml_replacements,
-            template_file="app.yaml",
-            output_file="app.yaml",
-        )
-
-        # Replacements dictionary
-        replacements = {
-            "agent_name": agent_name.upper(),
-            "application_name": str(config.application_name),
-            "user_identity": str(config.user_identity),
-            # "db": str(config.db),
-            # "schema": str(config.schema)
-        }
-
-        # Use utility to render and write the agent file
-        target_path = write_rendered_template(
-            template_dir=os.path.join(SSA_TEMPLATE_DIR, "source", "cao"),
-            agent_folder=agent_folder,
-            agent_name=agent_name,
-            replacements=replacements,
-            template_file="CAO_AGENT.py",
-            output_file=f"{agent_name.upper()}_AGENT.py",
-        )
-
-        # replacements = {
-        #     "agent_name": agent_name.upper(),
-        #     "application_name": str(config.application_name)
-        #     # "db": str(config.db),
-        #     # "schema": str(config.schema)
-        # }
-
-        # # Use utility to render and write the agent file
-        # target_path = write_rendered_template(
-        #     template_dir=os.path.join(SSA_TEMPLATE_DIR, "source"),
-        #     agent_folder=agent_folder,
-        #     agent_name=agent_name,
-        #     replacements=replacements,
-        #     template_file="cao_fastapi.py",
-        #     output_file=f"{config.application_name.lower()}_fastapi.py",
-        # )
+        output_yaml_path, target_path = render_runtime_files(agent_uuid, config)
 
         return MessageResponse(
             message=f"Runtime file '{os.path.basename(output_yaml_path)}' and '{os.path.basename(target_path)}' successfully generated.",
@@ -267,7 +345,8 @@ def configure_agent_runtime(
 @router.post("/{agent_uuid}/generate_agent_in_snowflake", response_model=GenerateSnowflakeAgentResponse)
 def generate_agent_in_snowflake(
     agent_uuid: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    provider: SnowflakeAgentProvider = Depends(get_snowflake_agent_provider)
 ):
     """
     Generate Snowflake Agent
@@ -295,7 +374,7 @@ def generate_agent_in_snowflake(
 
         # Step 2: Compute folder
         try:
-            agent_folder = os.path.join(SSA_AGENTS_DIR, agent_uuid, "source", agent_name.lower())
+            agent_folder = os.path.join(agent_dir(agent_uuid), "source", agent_name.lower())
             logger.debug(f"Computed agent_folder path={agent_folder}")
             logger.debug(f"Folder exists? {os.path.exists(agent_folder)}")
         except Exception as e:
@@ -325,7 +404,7 @@ def generate_agent_in_snowflake(
         # Create agent using the template function
         try:
             logger.info("Calling create_agent()...")
-            success, agent_url = create_agent(agent_name)
+            success, agent_url = provider.create_agent(agent_name)
             logger.debug(f"create_agent returned success={success}, agent_url={agent_url}")
         except Exception as e:
             logger.error(f"ERROR creating agent: {e}")
@@ -392,12 +471,25 @@ def generate_agent_in_snowflake(
 @router.get("/{agent_uuid}", response_model=AgentDetailsResponse)
 def get_agent_details(
     agent_uuid: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get agent details including tools
     """
     try:
+        # Served from the shared cache while the agent's version is unchanged
+        version = agent_crud.get_agent_version(db, agent_uuid)
+        if version is not None:
+            cached = get_shared_cache().get_or_load(
+                f"agent_details:{agent_uuid}",
+                version,
+                lambda: {
+                    "agent_details": agent_crud.get_agent_details(db, agent_uuid),
+                    "tools": tool_crud.get_tools_by_agent(db, agent_uuid)
+                }
+            )
+            return AgentDetailsResponse(agent_uuid=agent_uuid, **cached)
+
         # Get agent
         agent = agent_crud.get_agent(db, agent_uuid)
         if not agent:
@@ -427,7 +519,7 @@ def get_agent_details(
 @router.get("", response_model=AgentListResponse)
 def list_agents(
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     List all agents, optionally filtered by user_id
@@ -460,9 +552,10 @@ def delete_agent(
             raise HTTPException(status_code=404, detail="Agent not found")
         
         # Delete folder if exists
-        agent_folder = os.path.join(SSA_AGENTS_DIR, agent_uuid)
-        if os.path.exists(agent_folder):
+        agent_folder = resolve_agent_dir(agent_uuid)
+        if agent_folder is not None:
             shutil.rmtree(agent_folder)
+            forget_agent_dir(agent_uuid)
         
         return MessageResponse(
             message="Agent deleted successfully",
@@ -485,7 +578,7 @@ def create_session_endpoint(
     Create a new session entry when user logs in
     """
     try:
-        session = agent_crud.create_session(
+        session = session_crud.create_session(
             db=db,
             sesn_id=data.sesn_id,
             user_id=data.user_id,
@@ -504,3 +597,129 @@ def create_session_endpoint(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _materialize_agent(agent_uuid: str, definition: BulkAgentDefinition):
+    """
+    Copy the template and write agent.yaml, tool.yaml and the runtime files for one agent
+    """
+    details = definition.config
+    agent_name = details.agent_name.lower().replace(" ", "_") if details.agent_name else "default_agent"
+
+    agent_folder = adopt_agent_dir(agent_uuid, copy_template_to_agent_folder(agent_uuid, agent_name))
+    agent_name_folder = os.path.join(agent_folder, "source", agent_name)
+    create_agent_yaml(agent_name_folder, details)
+
+    if definition.tools:
+        update_tool_yaml(agent_name_folder, definition.tools, agent_name)
+
+    if definition.runtime_config:
+        render_runtime_files(agent_uuid, definition.runtime_config)
+
+
+@router.post("/bulk-import", response_model=BulkAgentImportResponse)
+def bulk_import_agents(
+    data: BulkAgentImportRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Import many agents at once
+    a. Check each agent's sessions (an unknown or expired session fails that agent)
+    b. Save agents, details and tools in batched transactions
+    c. Copy and render templates on a bounded thread pool; an agent whose files could
+       not be written has its rows and folder removed, so it can be imported again
+    d. Return a per-agent result report
+    """
+    try:
+        # Every item gets a result; repeats of an agent_uuid are reported as failed
+        items = [(d.agent_uuid or str(uuid.uuid4()), d) for d in data.agents]
+        sessions = {}
+
+        def session_error(d: BulkAgentDefinition) -> Optional[str]:
+            # Looked up once per sesn_id, from the session cache first
+            for sesn_id in (d.config.sesn_id, d.tools.sesn_id if d.tools else None):
+                if sesn_id and sesn_id not in sessions:
+                    sessions[sesn_id] = session_crud.get_session(db, sesn_id) is not None
+                if sesn_id and not sessions[sesn_id]:
+                    return "Session not found or expired"
+            return None
+
+        errors = {}
+        definitions = {}
+        for agent_uuid, d in items:
+            if agent_uuid in errors or agent_uuid in definitions:
+                continue
+            error = session_error(d)
+            if error:
+                errors[agent_uuid] = error
+            else:
+                definitions[agent_uuid] = d
+
+        errors.update(agent_crud.bulk_create_agents(
+            db=db,
+            user_id=data.user_id,
+            agents=[
+                (
+                    agent_uuid,
+                    d.config.model_dump(by_alias=True),
+                    [d.tools.model_dump()] if d.tools else []
+                )
+                for agent_uuid, d in definitions.items()
+            ],
+            batch_size=BULK_IMPORT_BATCH_SIZE
+        ))
+
+        saved = [agent_uuid for agent_uuid in definitions if errors[agent_uuid] is None]
+        with ThreadPoolExecutor(max_workers=BULK_IMPORT_WORKERS) as pool:
+            futures = {
+                agent_uuid: pool.submit(_materialize_agent, agent_uuid, definitions[agent_uuid])
+                for agent_uuid in saved
+            }
+        for agent_uuid, future in futures.items():
+            if future.exception():
+                errors[agent_uuid] = str(future.exception())
+
+        # Undo agents whose files could not be written
+        unmaterialized = [agent_uuid for agent_uuid in saved if errors[agent_uuid]]
+        if unmaterialized:
+            try:
+                agent_crud.delete_agents(db, unmaterialized)
+            except Exception as e:
+                logger.error(f"Bulk import could not remove rows of failed agents: {e}")
+                for agent_uuid in unmaterialized:
+                    errors[agent_uuid] += f" (its rows could not be removed: {e})"
+            for agent_uuid in unmaterialized:
+                agent_folder = resolve_agent_dir(agent_uuid)
+                if agent_folder is not None:
+                    shutil.rmtree(agent_folder, ignore_errors=True)
+                forget_agent_dir(agent_uuid)
+
+        results = []
+        reported = set()
+        for agent_uuid, d in items:
+            if agent_uuid in reported:
+                error = "Duplicate agent_uuid in request"
+            else:
+                reported.add(agent_uuid)
+                error = errors[agent_uuid]
+            if error:
+                logger.error(f"Bulk import failed for agent {agent_uuid}: {error}")
+            results.append(BulkAgentResult(
+                agent_uuid=agent_uuid,
+                agent_name=d.config.agent_name or "default_agent",
+                status="failed" if error else "success",
+                error=error
+            ))
+
+        succeeded = sum(1 for r in results if r.status == "success")
+        return BulkAgentImportResponse(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            results=results
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,37 @@
+"""
+Schemas for bulk agent import/export
+"""
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.api.schemas.ssa_api_schemas import (
+    AgentConfigCreateRequest,
+    AgentRuntimeConfig,
+    ToolConfig
+)
+
+
+class BulkAgentDefinition(BaseModel):
+    agent_uuid: Optional[str] = None
+    config: AgentConfigCreateRequest
+    tools: Optional[ToolConfig] = None
+    runtime_config: Optional[AgentRuntimeConfig] = None
+
+
+class BulkAgentImportRequest(BaseModel):
+    user_id: str
+    agents: List[BulkAgentDefinition]
+
+
+class BulkAgentResult(BaseModel):
+    agent_uuid: str
+    agent_name: str
+    status: str
+    error: Optional[str] = None
+
+
+class BulkAgentImportResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkAgentResult]
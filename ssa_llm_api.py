@@ -1,19 +1,38 @@
 """
 LLM endpoints
 """
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.api.deps import get_db
+from app.api.deps import get_read_db
+from app.database.database import SessionLocal
 from app.database.crud import ssa_llm as llm_crud
+from app.services.lsa_rate_limit import llm_rate_limiter
 from app.api.schemas.ssa_api_schemas import LLMModel
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+@router.on_event("startup")
+def load_llm_rate_limits():
+    db = SessionLocal()
+    try:
+        llm_rate_limiter.load(db)
+    except SQLAlchemyError as e:
+        # A fresh database may not have its tables yet; start without limits
+        # rather than failing the whole API
+        logger.warning(f"LLM rate limits not loaded, running without limits: {e}")
+    finally:
+        db.close()
+
+
 @router.get("/llms", response_model=List[LLMModel])
-def get_available_llms(db: Session = Depends(get_db)):
+def get_available_llms(db: Session = Depends(get_read_db)):
     """
     Step 3: Get list of available Snowflake Cortex LLMs
     """
@@ -22,3 +41,12 @@ def get_available_llms(db: Session = Depends(get_db)):
         return llms
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/llms/rate-limits")
+def get_llm_rate_limits():
+    """
+    Token bucket stats per provider and model: limits, tokens handed out, callers
+    queued and recent queue wait (avg / p95 / max, in ms)
+    """
+    return llm_rate_limiter.stats()
@@ -2,10 +2,11 @@
 SQLAlchemy models for database tables
 """
 from datetime import datetime
-from sqlalchemy import Column, String, LargeBinary, DateTime, Integer, ForeignKey, Text, TIMESTAMP
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 
 from app.database.database import Base
+from app.database.blob_codec import CompressedJSONBlob
 
 class User(Base):
     """Users table"""
@@ -43,7 +44,7 @@ class AgentDetails(Base):
     __tablename__ = "agent_details"
     
     agent_id = Column(String, ForeignKey("user_agent.agent_uuid"), primary_key=True, index=True)
-    agent_json = Column(LargeBinary, nullable=False)
+    agent_json = Column(CompressedJSONBlob, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -54,10 +55,13 @@ class AgentDetails(Base):
 class ToolDetails(Base):
     """Tool details table"""
     __tablename__ = "tool_details"
+    __table_args__ = (
+        Index("ix_tool_details_agent_id_created_at", "agent_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     agent_id = Column(String, ForeignKey("user_agent.agent_uuid"), nullable=False, index=True)
-    tool_json = Column(LargeBinary, nullable=False)
+    tool_json = Column(CompressedJSONBlob, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -69,4 +73,18 @@ class SnowflakeCortexLLM(Base):
     __tablename__ = "snowflake_cortex_llms"
     
     model_id = Column(String, primary_key=True, index=True)
-    model_name = Column(String, nullable=False)
\ No newline at end of file
+    model_name = Column(String, nullable=False)
+
+
+class UserSession(Base):
+    """User session table"""
+    __tablename__ = "user_session"
+    __table_args__ = (
+        Index("ix_user_session_user_id_expires_at", "user_id", "expires_at"),
+    )
+
+    sesn_id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    aplctn_cd = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
\ No newline at end of file
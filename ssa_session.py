@@ -0,0 +1,314 @@
+"""
+CRUD operations for user sessions
+Sessions are served from an in-memory TTL cache in front of the user_session table,
+and expired rows are removed in batches by a background sweeper. Every worker runs
+a sweeper, but each pass first takes a cross-process lock, so only one worker at a
+time deletes rows; the others just purge their own cache.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import func, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database.database import SessionLocal
+from app.database.data_classes.ssa_models import UserSession
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "28800"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+SESSION_SWEEP_LOCK_KEY = 0x5C4E3A02
+
+
+class SessionInfo(NamedTuple):
+    sesn_id: str
+    user_id: str
+    aplctn_cd: Optional[str]
+    expires_at: datetime
+
+
+# ---------------------------------------------------------------------
+# In-memory TTL cache
+# ---------------------------------------------------------------------
+class SessionCache:
+    """
+    Bounded LRU cache of live sessions. Entries are dropped once expired.
+    """
+
+    def __init__(self, max_size: int = SESSION_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sesn_id: str) -> Optional[SessionInfo]:
+        with self._lock:
+            info = self._items.get(sesn_id)
+            if info is None:
+                return None
+            if info.expires_at <= datetime.utcnow():
+                del self._items[sesn_id]
+                return None
+            self._items.move_to_end(sesn_id)
+            return info
+
+    def put(self, info: SessionInfo):
+        with self._lock:
+            self._items[info.sesn_id] = info
+            self._items.move_to_end(info.sesn_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [k for k, v in self._items.items() if v.expires_at <= now]
+            for k in expired:
+                del self._items[k]
+        return len(expired)
+
+
+session_cache = SessionCache()
+
+
+# ---------------------------------------------------------------------
+# Session CRUD
+# ---------------------------------------------------------------------
+def _insert_session(db: Session, values: dict) -> int:
+    """
+    Insert a session row, ignoring live duplicates. A row whose TTL has
+    passed but that has not been swept yet is replaced (ON CONFLICT DO UPDATE on
+    SQLite / PostgreSQL, ON DUPLICATE KEY UPDATE on MySQL).
+    Returns the number of rows written.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(UserSession).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserSession.sesn_id],
+            set_={k: stmt.excluded[k] for k in values if k != "sesn_id"},
+            where=UserSession.expires_at <= values["created_at"]
+        )
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(UserSession).values(**values)
+        expired = UserSession.expires_at <= values["created_at"]
+        # MySQL applies the assignments in order, so expires_at goes last and the
+        # other columns still see the old expiry
+        columns = [k for k in values if k not in ("sesn_id", "expires_at")] + ["expires_at"]
+        stmt = stmt.on_duplicate_key_update([
+            (k, func.if_(expired, stmt.inserted[k], getattr(UserSession, k))) for k in columns
+        ])
+    else:
+        stmt = insert(UserSession).values(**values)
+
+    try:
+        result = db.execute(stmt)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return 0
+    if dialect == "mysql" and result.rowcount == 1:
+        # With CLIENT_FOUND_ROWS a live duplicate left as it was also reports 1 row
+        return int(_row_matches(db, values))
+    return result.rowcount
+
+
+def _row_matches(db: Session, values: dict) -> bool:
+    row = db.query(UserSession.user_id, UserSession.expires_at).filter(
+        UserSession.sesn_id == values["sesn_id"]
+    ).first()
+    # DATETIME columns may round away the microseconds
+    return bool(row) and row.user_id == values["user_id"] and \
+        abs((row.expires_at - values["expires_at"]).total_seconds()) < 1
+
+
+def create_session(db: Session, sesn_id: str, user_id: str, aplctn_cd: Optional[str] = None) -> Optional[SessionInfo]:
+    """
+    Create a new session. Returns None if a live session with this id already exists.
+    """
+    if session_cache.get(sesn_id):
+        return None
+
+    now = datetime.utcnow()
+    info = SessionInfo(
+        sesn_id=sesn_id,
+        user_id=user_id,
+        aplctn_cd=aplctn_cd,
+        expires_at=now + timedelta(seconds=SESSION_TTL_SECONDS)
+    )
+    written = _insert_session(db, {
+        "sesn_id": sesn_id,
+        "user_id": user_id,
+        "aplctn_cd": aplctn_cd,
+        "created_at": now,
+        "expires_at": info.expires_at
+    })
+    if not written:
+        return None
+
+    session_cache.put(info)
+    return info
+
+
+def get_session(db: Session, sesn_id: str) -> Optional[SessionInfo]:
+    """
+    Get a live session, from the cache when possible
+    """
+    info = session_cache.get(sesn_id)
+    if info:
+        return info
+
+    row = db.query(UserSession).filter(
+        UserSession.sesn_id == sesn_id,
+        UserSession.expires_at > datetime.utcnow()
+    ).first()
+    if not row:
+        return None
+
+    info = SessionInfo(
+        sesn_id=row.sesn_id,
+        user_id=row.user_id,
+        aplctn_cd=row.aplctn_cd,
+        expires_at=row.expires_at
+    )
+    session_cache.put(info)
+    return info
+
+
+def sweep_expired_sessions(db: Session, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+    """
+    Delete expired sessions in chunks of batch_size, committing after each chunk
+    so the table is never locked for long.
+    Returns number of deleted sessions
+    """
+    total = 0
+    now = datetime.utcnow()
+    while True:
+        ids = [
+            row.sesn_id for row in
+            db.query(UserSession.sesn_id)
+            .filter(UserSession.expires_at <= now)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            break
+        total += db.query(UserSession).filter(
+            UserSession.sesn_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        if len(ids) < batch_size:
+            break
+
+    session_cache.purge_expired()
+    return total
+
+
+# ---------------------------------------------------------------------
+# Background sweeper
+# ---------------------------------------------------------------------
+_sweeper_stop = threading.Event()
+_sweeper_thread: Optional[threading.Thread] = None
+
+
+@contextmanager
+def sweep_lock(engine: Engine):
+    """
+    Non-blocking cross-process lock for one sweep pass. Yields True when this
+    process owns it (a file lock for SQLite, an advisory lock on PostgreSQL / MySQL).
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        database = engine.url.database
+        if not database or database == ":memory:":
+            yield True
+            return
+        import fcntl
+        with open(f"{os.path.abspath(database)}.sweep.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    elif dialect == "postgresql":
+        # Advisory locks belong to the connection, so hold one for the whole pass
+        with engine.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SESSION_SWEEP_LOCK_KEY}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SESSION_SWEEP_LOCK_KEY})
+    elif dialect in ("mysql", "mariadb"):
+        with engine.connect() as conn:
+            acquired = conn.execute(text("SELECT GET_LOCK('session_sweep', 0)")).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT RELEASE_LOCK('session_sweep')"))
+    else:
+        yield True
+
+
+def _sweep_loop(interval: int, batch_size: int):
+    while not _sweeper_stop.wait(interval):
+        db = SessionLocal()
+        try:
+            with sweep_lock(db.get_bind()) as owner:
+                if not owner:
+                    # Another worker is sweeping the table this round
+                    session_cache.purge_expired()
+                    continue
+                deleted = sweep_expired_sessions(db, batch_size)
+            if deleted:
+                logger.info(f"Session sweeper removed {deleted} expired sessions")
+        except Exception as e:
+            logger.error(f"Session sweeper failed: {e}")
+        finally:
+            db.close()
+
+
+def start_session_sweeper(interval: int = SESSION_SWEEP_INTERVAL_SECONDS, batch_size: int = SESSION_SWEEP_BATCH_SIZE):
+    """
+    Start the periodic sweeper thread (no-op if already running)
+    """
+    global _sweeper_thread
+    if _sweeper_thread and _sweeper_thread.is_alive():
+        return
+    _sweeper_stop.clear()
+    _sweeper_thread = threading.Thread(
+        target=_sweep_loop,
+        args=(interval, batch_size),
+        name="session-sweeper",
+        daemon=True
+    )
+    _sweeper_thread.start()
+
+
+def stop_session_sweeper():
+    """
+    Stop the periodic sweeper thread
+    """
+    global _sweeper_thread
+    _sweeper_stop.set()
+    if _sweeper_thread:
+        _sweeper_thread.join(timeout=5)
+        _sweeper_thread = None
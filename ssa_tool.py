@@ -1,11 +1,11 @@
 """
 CRUD operations for tools
 """
-import json
 from typing import List
 from sqlalchemy.orm import Session
 
 from app.database.data_classes.ssa_models import ToolDetails
+from app.database.blob_codec import dumps_json, loads_json
 from app.api.schemas.ssa_api_schemas import ToolConfig
 
 
@@ -13,7 +13,7 @@ def create_tool(db: Session, agent_uuid: str, tool: ToolConfig) -> ToolDetails:
     """
     Add a tool to an agent
     """
-    tool_json = json.dumps(tool.model_dump()).encode()
+    tool_json = dumps_json(tool.model_dump())
     
     db_tool = ToolDetails(
         agent_id=agent_uuid,
@@ -31,7 +31,7 @@ def get_tools_by_agent(db: Session, agent_uuid: str) -> List[dict]:
     Get all tools for a specific agent
     """
     tools = db.query(ToolDetails).filter(ToolDetails.agent_id == agent_uuid).all()
-    return [json.loads(tool.tool_json.decode()) for tool in tools]
+    return [loads_json(tool.tool_json) for tool in tools]
 
 
 # For future use
@@ -2,28 +2,60 @@
 Tool endpoints
 """
 import os
+import yaml
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
 from app.database.crud import ssa_agent as agent_crud
 from app.database.crud import ssa_tool as tool_crud
-from app.api.schemas.ssa_api_schemas import ToolConfig, ToolResponse, ToolConfigRequest
+from app.database.crud import ssa_session as session_crud
+from app.api.schemas.ssa_api_schemas import ToolResponse, ToolConfigRequest
+from app.api.schemas.ssa_tool_schemas import CachedToolConfig, ToolCacheConfig
 from app.utils.yaml_generator import update_tool_yaml
-from app.config import SSA_AGENTS_DIR
+from app.utils.agent_paths import ensure_agent_dir
 
 router = APIRouter()
 
+TOOL_CACHE_DEFAULTS = {"enabled": True, "ttl_seconds": 300, "max_entries": 256, "max_bytes": 8 * 1024 * 1024}
+
+
+def tool_cache_settings(cache: Optional[ToolCacheConfig]):
+    """
+    Result cache settings for a tool, or None when the tool did not opt in
+    """
+    if cache is None:
+        return None
+    settings = {**TOOL_CACHE_DEFAULTS, **cache.model_dump(exclude_none=True)}
+    return {key: settings[key] for key in TOOL_CACHE_DEFAULTS}
+
+
+def write_tool_cache_settings(agent_name_folder: str, cache_settings: dict):
+    """
+    Merge per-tool cache settings into the `tool_cache` block of tool.yaml
+    """
+    if not cache_settings:
+        return
+    tool_yaml_path = os.path.join(agent_name_folder, "tool.yaml")
+    content = {}
+    if os.path.exists(tool_yaml_path):
+        with open(tool_yaml_path, "r") as f:
+            content = yaml.safe_load(f) or {}
+    content.setdefault("tool_cache", {}).update(cache_settings)
+    with open(tool_yaml_path, "w") as f:
+        yaml.safe_dump(content, f, sort_keys=False)
+
 
 @router.post("/{agent_uuid}/tools", response_model=ToolResponse)
 def add_tool(
     agent_uuid: str,
-    tool: ToolConfig,
+    tool: CachedToolConfig,
     db: Session = Depends(get_db)
 ):
     """
     Add tools and tool resources to an agent
-    - Processes tool_choice, tools, and tool_resources from frontend
+    - Processes tool_choice, tools, tool_resources and tool_cache from frontend
     - Saves to new configuration tables
     - Updates tool.yaml
     """
@@ -33,17 +65,27 @@ def add_tool(
         # if not agent:
         #     raise HTTPException(status_code=404, detail="Agent not found")
         
-        # Check if agent folder exists, create if it doesn't
-        agent_folder = os.path.join(SSA_AGENTS_DIR, agent_uuid)
-        if not os.path.exists(agent_folder):
-            os.makedirs(agent_folder, exist_ok=True)
-            # Create the source directory structure as well
-            source_dir = os.path.join(agent_folder, "source")
-            os.makedirs(source_dir, exist_ok=True)
+        # Reject unknown or expired sessions (looked up in the session cache first)
+        if tool.sesn_id and not session_crud.get_session(db, tool.sesn_id):
+            raise HTTPException(status_code=401, detail="Session not found or expired")
+
+        unknown = set(tool.tool_cache) - {tool_d.name for tool_d in tool.tools}
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"tool_cache refers to tools not in this request: {', '.join(sorted(unknown))}"
+            )
+
+        # Agent folder (with its source directory), created in its shard if it doesn't exist
+        agent_folder = ensure_agent_dir(agent_uuid)
         
         # Process and save each tool configuration
         created_tools = []
+        cache_settings = {}
         for tool_d in tool.tools:
+            cache = tool_cache_settings(tool.tool_cache.get(tool_d.name))
+            if cache:
+                cache_settings[tool_d.name] = cache
             # Create tool configuration
             tool_obj = tool_crud.create_tool_config(
                 db=db,
@@ -55,7 +97,8 @@ def add_tool(
                 tool_desc=tool_d.description,
                 tool_config={
                     "type": tool_d.type,
-                    "tool_choice": tool.tool_choice.model_dump() if tool.tool_choice else None
+                    "tool_choice": tool.tool_choice.model_dump() if tool.tool_choice else None,
+                    "cache": cache
                 }
             )
             created_tools.append(tool_obj)
@@ -95,6 +138,7 @@ def add_tool(
         
         # Update tool.yaml
         update_tool_yaml(agent_name_folder, tool, agent_name)
+        write_tool_cache_settings(agent_name_folder, cache_settings)
         
         return ToolResponse(
             message=f"Successfully added {len(created_tools)} tools with resources",
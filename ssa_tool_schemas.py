@@ -0,0 +1,19 @@
+"""
+Schemas for tool configuration extensions
+"""
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+from app.api.schemas.ssa_api_schemas import ToolConfig
+
+
+class ToolCacheConfig(BaseModel):
+    enabled: bool = True
+    ttl_seconds: Optional[int] = None
+    max_entries: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+
+class CachedToolConfig(ToolConfig):
+    # Result cache settings keyed by tool name; tools without an entry are not cached
+    tool_cache: Dict[str, ToolCacheConfig] = {}
@@ -0,0 +1,81 @@
+"""
+Startup benchmark for the builder app.
+
+Imports the app module in fresh interpreters and reports wall-clock import time,
+the slowest modules from -X importtime, and whether heavy integrations were loaded eagerly.
+
+    python -m app.utils.startup_benchmark --module app.main --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Integrations that should only be imported on first use
+LAZY_MODULES = [
+    "templates.ssa_template.source.agent_builder",
+]
+
+
+def time_import(module: str) -> float:
+    """
+    Wall-clock seconds to start an interpreter and import module
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start
+
+
+def slowest_imports(module: str, top: int = 10):
+    """
+    Returns [(cumulative_ms, module)] for the slowest imports of module
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def eagerly_loaded(module: str):
+    """
+    Returns the LAZY_MODULES that importing module loads anyway
+    """
+    check = f"import sys, {module}; print('\\n'.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    return [line for line in proc.stdout.splitlines() if line]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure builder app startup time")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    timings = [time_import(args.module) * 1000 for _ in range(args.runs)]
+    print(f"Import {args.module} over {args.runs} runs: "
+          f"min {min(timings):.1f} ms, median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative_ms, name in slowest_imports(args.module, args.top):
+        print(f"  {cumulative_ms:9.1f} ms  {name}")
+
+    eager = eagerly_loaded(args.module)
+    if eager:
+        print(f"\nLoaded at import time but expected lazy: {', '.join(eager)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
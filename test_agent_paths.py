@@ -0,0 +1,82 @@
+"""
+Sharded agent folders and the per-process path index
+"""
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.utils import agent_paths
+from app.utils.agent_paths import AgentPathIndex, legacy_path, migrate_flat_layout, shard_path
+from app.utils.zip_stream import iter_folder, stream_zip
+
+AGENT = "3f2b6c1e-8d4a-4f7e-9b0c-2a1d5e6f7a8b"
+
+
+@pytest.fixture(autouse=True)
+def agents_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_paths, "SSA_AGENTS_DIR", str(tmp_path))
+    monkeypatch.setattr(agent_paths, "agent_paths", AgentPathIndex())
+    return tmp_path
+
+
+def make_flat_agent(agent_uuid=AGENT):
+    folder = legacy_path(agent_uuid)
+    os.makedirs(os.path.join(folder, "source", "claims"))
+    with open(os.path.join(folder, "source", "claims", "agent.py"), "w") as f:
+        f.write("print('agent')\n")
+    return folder
+
+
+def test_ensure_creates_folder_in_shard():
+    index = AgentPathIndex()
+
+    path = index.ensure(AGENT)
+
+    assert path == shard_path(AGENT)
+    assert os.path.isdir(os.path.join(path, "source"))
+    assert index.resolve(AGENT) == path
+
+
+def test_resolve_follows_folder_moved_by_another_worker():
+    legacy = make_flat_agent()
+    worker_a, worker_b = AgentPathIndex(), AgentPathIndex()
+    assert worker_a.resolve(AGENT) == legacy
+
+    worker_b.adopt(AGENT, legacy)
+
+    assert worker_a.resolve(AGENT) == shard_path(AGENT)
+
+
+def test_resolve_drops_folder_deleted_by_another_worker():
+    worker_a, worker_b = AgentPathIndex(), AgentPathIndex()
+    worker_a.ensure(AGENT)
+
+    path = worker_b.resolve(AGENT)
+    os.rename(path, path + ".deleted")
+
+    assert worker_a.resolve(AGENT) is None
+
+
+def test_migrate_moves_flat_folders_only(agents_dir):
+    make_flat_agent()
+    AgentPathIndex().ensure("already-sharded")
+
+    assert migrate_flat_layout(dry_run=True) == [AGENT]
+    assert os.path.isdir(legacy_path(AGENT))
+
+    assert migrate_flat_layout() == [AGENT]
+    assert not os.path.exists(legacy_path(AGENT))
+    assert os.path.isfile(os.path.join(shard_path(AGENT), "source", "claims", "agent.py"))
+    assert migrate_flat_layout() == []
+
+
+def test_download_zip_is_rooted_at_agent_folder():
+    folder = AgentPathIndex().adopt(AGENT, make_flat_agent())
+    with open(os.path.join(folder, "app.yaml"), "w") as f:
+        f.write("Agents: {}\n")
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(iter_folder(folder, "")))))
+
+    assert sorted(archive.namelist()) == ["app.yaml", "source/claims/agent.py"]
@@ -0,0 +1,44 @@
+"""
+Token-budget compaction of Cortex messages
+"""
+from cao.cao_compaction import Compactor, TRUNCATED_MARKER, message_tokens
+
+
+def tool_result_message(payload):
+    return {
+        "role": "user",
+        "content": [{
+            "type": "tool_results",
+            "tool_results": {
+                "tool_use_id": "t1",
+                "name": "claims_analyst",
+                "content": [{"type": "json", "json": payload}],
+            },
+        }],
+    }
+
+
+def test_dict_tool_result_is_counted_and_truncated():
+    payload = {"sql": "select * from claims", "rows": [{"member": i, "amount": i * 10} for i in range(500)]}
+    messages = [
+        {"role": "user", "content": "claims for member 42"},
+        {"role": "assistant", "content": [{"type": "tool_use", "tool_use": {"tool_use_id": "t1", "name": "claims_analyst", "input": {}}}]},
+        tool_result_message(payload),
+    ]
+    assert message_tokens(messages[2]) > 1000
+
+    compacted = Compactor({"enabled": True, "max_tool_output_tokens": 200}).compact(messages)
+
+    item = compacted[2]["content"][0]["tool_results"]["content"][0]
+    assert item["type"] == "text"
+    assert item["text"].startswith('{"sql": "select * from claims"')
+    assert item["text"].endswith(TRUNCATED_MARKER)
+    assert message_tokens(compacted[2]) <= 200
+    # The caller's messages are untouched
+    assert messages[2]["content"][0]["tool_results"]["content"][0]["json"] is payload
+
+
+def test_small_dict_tool_result_is_kept():
+    messages = [{"role": "user", "content": "hi"}, tool_result_message({"rows": [1, 2]})]
+    compacted = Compactor({"enabled": True}).compact(messages)
+    assert compacted == messages
@@ -0,0 +1,31 @@
+"""
+Load driver against the fake Snowflake server
+"""
+import pytest
+
+from cao.cao_loadtest import drive, serve_fake
+
+
+@pytest.fixture
+def fake_server():
+    server = serve_fake(0, latency="fixed:100", auth_latency="fixed:0")
+    yield f"http://127.0.0.1:{server.server_port}/api/v2/cortex/inference:complete"
+    server.shutdown()
+
+
+def test_drive_reports_latency(fake_server):
+    result = drive(fake_server, rps=20, duration=0.5)
+
+    assert result["sent"] == result["succeeded"] == 10
+    assert result["statuses"] == {200: 10}
+    assert 100 <= result["latency_ms"]["p50"] < 1000
+
+
+def test_latency_counts_time_behind_schedule(fake_server):
+    # One worker serves 100 ms requests scheduled every 50 ms, so each request starts
+    # later than planned; that backlog must show in the latency, not be hidden
+    result = drive(fake_server, rps=20, duration=0.5, max_workers=1)
+
+    assert result["succeeded"] == 10
+    assert result["latency_ms"]["max"] >= 500
+    assert result["max_start_lag_ms"] >= 400
@@ -0,0 +1,138 @@
+"""
+Warm runner pool: sessions are opened per warm runner, builders are fresh per request
+"""
+import asyncio
+import sys
+import types
+
+import pytest
+
+from cao import cao_pool
+from cao.cao_pool import RunnerPool
+
+
+class FakeSession:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.is_expired = False
+
+    def expired(self):
+        return self.is_expired
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAgentRun:
+    sessions = []
+
+    @classmethod
+    def open_session(cls, builder):
+        assert builder.settings["agent_name"] == "CLAIMS"
+        session = FakeSession(len(cls.sessions) + 1)
+        cls.sessions.append(session)
+        return session
+
+    class Builder:
+        def __init__(self):
+            self.settings = {}
+
+        def __getattr__(self, setter):
+            def set_value(value=None):
+                self.settings[setter] = value
+                return self
+            return set_value
+
+        def build(self):
+            return self
+
+
+@pytest.fixture
+def agent_stack(monkeypatch):
+    FakeAgentRun.sessions = []
+    monkeypatch.setitem(sys.modules, "agent", types.SimpleNamespace(AgentRun=FakeAgentRun))
+    monkeypatch.setattr(cao_pool, "agent_env_config", lambda agent_name, env: {"db": "CLAIMS_DB"})
+    return FakeAgentRun
+
+
+def run(pool, fail=False, messages=None):
+    async def use():
+        async with pool.checkout() as builder:
+            if messages is not None:
+                builder.messages(messages)
+            if fail:
+                raise RuntimeError("agent run failed")
+            return builder
+    return asyncio.run(use())
+
+
+def test_one_session_per_warm_runner(agent_stack):
+    pool = RunnerPool("CLAIMS", "dev", size=2)
+    pool.warm()
+    assert len(agent_stack.sessions) == 2
+
+    builders = [run(pool) for _ in range(10)]
+
+    assert len(agent_stack.sessions) == 2
+    assert {b.settings["session"].number for b in builders} <= {1, 2}
+    assert pool.stats()["sessions_opened"] == 2
+
+
+def test_each_request_gets_a_fresh_builder(agent_stack):
+    pool = RunnerPool("CLAIMS", "dev", size=1)
+    pool.warm()
+
+    first = run(pool, messages=[{"role": "user", "content": "first"}])
+    second = run(pool)
+
+    assert first is not second
+    assert "messages" not in second.settings
+    assert second.settings["agent_db"] == "CLAIMS_DB"
+    assert second.settings["session"] is first.settings["session"]
+
+
+def test_busy_pool_opens_extra_session_and_keeps_size_idle(agent_stack):
+    pool = RunnerPool("CLAIMS", "dev", size=1)
+    pool.warm()
+
+    async def overlapping():
+        async with pool.checkout() as a, pool.checkout() as b:
+            return a.settings["session"], b.settings["session"]
+
+    first, second = asyncio.run(overlapping())
+
+    assert first is not second
+    assert pool.stats()["idle"] == 1
+    assert sorted(s.closed for s in agent_stack.sessions) == [False, True]
+
+
+def test_failed_run_closes_its_session(agent_stack):
+    pool = RunnerPool("CLAIMS", "dev", size=1)
+    pool.warm()
+
+    with pytest.raises(RuntimeError):
+        run(pool, fail=True)
+
+    assert agent_stack.sessions[0].closed
+    assert run(pool).settings["session"].number == 2
+
+
+def test_expired_session_is_reopened(agent_stack):
+    pool = RunnerPool("CLAIMS", "dev", size=1)
+    pool.warm()
+    agent_stack.sessions[0].is_expired = True
+
+    assert run(pool).settings["session"].number == 2
+    assert agent_stack.sessions[0].closed
+
+
+def test_agent_stack_without_sessions(agent_stack, monkeypatch):
+    monkeypatch.delattr(FakeAgentRun, "open_session")
+    pool = RunnerPool("CLAIMS", "dev", size=1)
+    pool.warm()
+
+    builder = run(pool)
+
+    assert "session" not in builder.settings
+    assert builder.settings["agent_name"] == "CLAIMS"
@@ -0,0 +1,78 @@
+"""
+Request coalescing for run_agent
+"""
+import asyncio
+
+from cao.cao_cache import request_key
+from cao.cao_singleflight import SingleFlight
+
+MESSAGES = [{"role": "user", "content": "claims for member 42"}]
+
+
+def gather(flight, fn, n=3):
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(n)))
+    return asyncio.run(run())
+
+
+def counting(make_result, delay=0.05):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return make_result()
+    return fn, calls
+
+
+def test_json_results_are_shared_as_copies():
+    flight = SingleFlight()
+    fn, calls = counting(lambda: {"answer": ["ok"]})
+
+    results = gather(flight, fn)
+
+    assert len(calls) == 1
+    assert results == [{"answer": ["ok"]}] * 3
+    results[1]["answer"].append("changed")
+    assert results[0] == results[2] == {"answer": ["ok"]}
+    assert flight.stats()["coalesced"] == 2
+
+
+def test_stream_results_run_separately():
+    flight = SingleFlight()
+
+    def stream():
+        yield b"chunk"
+    fn, calls = counting(stream)
+
+    results = gather(flight, fn)
+
+    assert len(calls) == 3
+    assert [list(r) for r in results] == [[b"chunk"]] * 3
+    assert flight.stats()["ran_separately"] == 2
+
+
+def test_execution_cancelled_when_last_waiter_leaves():
+    flight = SingleFlight()
+    fn, _ = counting(lambda: {"answer": "late"}, delay=5)
+
+    async def run():
+        waiters = [asyncio.create_task(flight.do("key", fn)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_request_key_includes_application_name():
+    first = request_key(MESSAGES, "CLAIMS", "dev", "user-1", "claims_portal")
+    second = request_key(MESSAGES, "CLAIMS", "dev", "user-1", "member_portal")
+
+    assert first != second
+    assert first == request_key([{"role": "user", "content": " claims  for member 42 "}],
+                                "CLAIMS", "dev", "user-1", "claims_portal")
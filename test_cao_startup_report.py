@@ -0,0 +1,55 @@
+"""
+Cold-start report: phases and import breakdown, measured against a stub agent stack
+"""
+import pytest
+
+from cao.cao_startup_report import measure_startup, report
+
+STUB_AGENT = '''
+class AgentRun:
+    class Builder:
+        def __getattr__(self, setter):
+            return lambda *args: self
+'''
+
+
+@pytest.fixture(scope="module")
+def startup(tmp_path_factory):
+    # Measured once for the module: each measurement starts a fresh interpreter
+    root = tmp_path_factory.mktemp("startup")
+    config_dir = root / "genai"
+    config_dir.mkdir()
+    (config_dir / "app.yaml").write_text("Agents: {}\n")
+    stubs = root / "stubs"
+    stubs.mkdir()
+    (stubs / "agent.py").write_text(STUB_AGENT)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("env_name", "dev")
+        monkeypatch.setenv("GENAI_PATH", str(config_dir))
+        monkeypatch.setenv("CAO_POOL_SIZE", "2")
+        monkeypatch.delenv("CAO_SNOWFLAKE_BASE_URL", raising=False)
+        return measure_startup("cao_fastapi", sys_path=[str(stubs)])
+
+
+def test_report_has_phases(startup, capsys):
+    assert startup["import_ms"] > 0
+    assert startup["startup_ms"] >= 0
+    assert startup["ready_ms"] == pytest.approx(startup["import_ms"] + startup["startup_ms"])
+
+    assert report(startup, top=5) == startup["ready_ms"]
+    out = capsys.readouterr().out
+    assert "Time to ready" in out
+    assert "Slowest by cumulative time (top 5)" in out
+
+
+def test_agent_stack_loads_during_startup(startup):
+    rows = startup["rows"]
+    names = [name for name, _, _, _ in rows]
+    assert all(self_us <= cumulative_us for _, self_us, cumulative_us, _ in rows)
+
+    # Pool warm-up imports the agent stack after the service's own modules
+    runtime = [i for i, name in enumerate(names) if name == "cao" or name.startswith("cao.")]
+    assert runtime
+    assert "agent" in names
+    assert names.index("agent") > max(runtime)
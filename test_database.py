@@ -0,0 +1,89 @@
+"""
+Replica routing with a primary and a replica SQLite file
+"""
+import itertools
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select, text, update
+from sqlalchemy.orm import declarative_base
+
+from app.database import database
+from app.database.database import ReadSessionLocal
+
+RoutingBase = declarative_base()
+
+
+class Item(RoutingBase):
+    __tablename__ = "routing_item"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "on primary"), (replica, "on replica")):
+        RoutingBase.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Item.__table__.insert().values(id=1, name=name))
+
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "_replica_cycle", itertools.cycle([replica]))
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def item_name(db, item_id=1):
+    return db.execute(select(Item.name).where(Item.id == item_id)).scalar()
+
+
+def test_reads_go_to_replica(engines):
+    with ReadSessionLocal() as db:
+        assert item_name(db) == "on replica"
+        assert db.get(Item, 1).name == "on replica"
+        # A flush with nothing pending is not a write
+        db.flush()
+        assert item_name(db) == "on replica"
+
+
+def test_session_reads_its_own_writes(engines):
+    primary, replica = engines
+    with ReadSessionLocal() as db:
+        assert item_name(db) == "on replica"
+        db.add(Item(id=2, name="new"))
+        db.commit()
+
+        assert item_name(db, 2) == "new"
+        assert item_name(db) == "on primary"
+
+    with primary.connect() as conn:
+        assert conn.execute(text("SELECT name FROM routing_item WHERE id = 2")).scalar() == "new"
+    with replica.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM routing_item")).scalar() == 1
+
+
+def test_dml_statement_goes_to_primary(engines):
+    primary, _ = engines
+    with ReadSessionLocal() as db:
+        db.execute(update(Item).where(Item.id == 1).values(name="renamed"))
+        db.commit()
+        assert item_name(db) == "renamed"
+
+    with primary.connect() as conn:
+        assert conn.execute(text("SELECT name FROM routing_item WHERE id = 1")).scalar() == "renamed"
+
+
+def test_new_session_reads_from_replica_again(engines):
+    with ReadSessionLocal() as db:
+        db.add(Item(id=2, name="new"))
+        db.commit()
+    with ReadSessionLocal() as db:
+        assert item_name(db) == "on replica"
+
+
+def test_primary_only_without_replicas(engines, monkeypatch):
+    monkeypatch.setattr(database, "_replica_cycle", None)
+    with ReadSessionLocal() as db:
+        assert item_name(db) == "on primary"
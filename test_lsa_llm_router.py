@@ -0,0 +1,200 @@
+"""
+LLM router against local fake provider servers
+"""
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.lsa_llm_router import LLMRouter, LLMRoutingError, ROUTER_MIN_SAMPLES
+
+
+def make_handler(model_id, calls, delay=0.0, status=200):
+    """
+    Fake chat-completions endpoint that answers as model_id after delay seconds
+    """
+    class FakeProviderHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            calls[model_id] = calls.get(model_id, 0) + 1
+            time.sleep(delay)
+            if status >= 400:
+                body = json.dumps({"error": {"message": f"{model_id} unavailable"}}).encode()
+            else:
+                body = json.dumps({"model": model_id, "choices": [{"message": {"content": "ok"}}]}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeProviderHandler
+
+
+@pytest.fixture
+def providers():
+    """
+    start({model_id: (delay_seconds, status)}) -> (invoke, calls)
+    """
+    servers = []
+
+    def start(models):
+        calls, urls = {}, {}
+        for model_id, (delay, status) in models.items():
+            server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(model_id, calls, delay, status))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers.append(server)
+            urls[model_id] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+        def post(model_id, payload):
+            request = urllib.request.Request(
+                urls[model_id], data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return json.loads(response.read())
+
+        async def invoke(model_id, payload):
+            return await asyncio.to_thread(post, model_id, payload)
+
+        return invoke, calls
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+PAYLOAD = {"messages": [{"role": "user", "content": "hello"}]}
+
+
+def test_fails_over_to_equivalent(providers):
+    invoke, calls = providers({"primary": (0, 503), "backup": (0, 200)})
+    router = LLMRouter(invoke, hedge=False)
+
+    answer = asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+
+    assert answer["model_id"] == "backup"
+    assert answer["result"]["model"] == "backup"
+    assert calls == {"primary": 1, "backup": 1}
+    assert router.stats()["primary"]["requests"] == 1
+
+
+def test_all_candidates_failing_raises(providers):
+    invoke, _ = providers({"primary": (0, 500), "backup": (0, 503)})
+    router = LLMRouter(invoke, hedge=False)
+
+    with pytest.raises(LLMRoutingError) as error:
+        asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+    assert set(error.value.errors) == {"primary", "backup"}
+
+
+def test_high_error_rate_demotes_model(providers):
+    invoke, calls = providers({"primary": (0, 500), "backup": (0, 200)})
+    router = LLMRouter(invoke, hedge=False, max_error_rate=0.5)
+
+    async def run(n):
+        return [await router.complete("primary", PAYLOAD, ["backup"]) for _ in range(n)]
+
+    asyncio.run(run(ROUTER_MIN_SAMPLES))
+    assert router.candidates("primary", ["backup"]) == ["backup", "primary"]
+
+    # Once demoted, the failing model is no longer tried first
+    answers = asyncio.run(run(5))
+    assert all(a["model_id"] == "backup" for a in answers)
+    assert calls["primary"] == ROUTER_MIN_SAMPLES
+
+
+def test_hedge_wins_over_slow_primary(providers):
+    invoke, calls = providers({"primary": (1.5, 200), "backup": (0.05, 200)})
+    router = LLMRouter(invoke, hedge=True, hedge_min_delay_ms=100)
+    router.stats_for("primary").p95_ms = lambda: 100.0
+
+    async def timed():
+        # Timed inside the loop: asyncio.run also waits for the abandoned primary's thread
+        start = time.perf_counter()
+        answer = await router.complete("primary", PAYLOAD, ["backup"])
+        return answer, time.perf_counter() - start
+
+    answer, elapsed = asyncio.run(timed())
+
+    assert answer["model_id"] == "backup"
+    assert elapsed < 1.0
+    assert calls["backup"] == 1
+    assert router.stats()["backup"]["hedges_won"] == 1
+
+
+def test_no_hedge_when_primary_is_fast(providers):
+    invoke, calls = providers({"primary": (0.02, 200), "backup": (0.02, 200)})
+    router = LLMRouter(invoke, hedge=True, hedge_min_delay_ms=500)
+
+    answer = asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+
+    assert answer["model_id"] == "primary"
+    assert "backup" not in calls
+
+
+class SlowLimiter:
+    """
+    Rate limiter stand-in: acquire waits wait_seconds, try_acquire answers free_token
+    """
+
+    def __init__(self, wait_seconds=0.0, free_token=True):
+        self.wait_seconds = wait_seconds
+        self.free_token = free_token
+        self.acquired = []
+
+    async def acquire(self, model_id, agent_id="default"):
+        await asyncio.sleep(self.wait_seconds)
+        self.acquired.append(model_id)
+        return self.wait_seconds
+
+    def try_acquire(self, model_id):
+        if self.free_token:
+            self.acquired.append(model_id)
+        return self.free_token
+
+
+def test_limiter_wait_does_not_start_hedge_timer(providers):
+    invoke, calls = providers({"primary": (0.05, 200), "backup": (0, 200)})
+    limiter = SlowLimiter(wait_seconds=0.3)
+    router = LLMRouter(invoke, hedge=True, hedge_min_delay_ms=200, limiter=limiter)
+    router.stats_for("primary").p95_ms = lambda: 200.0
+
+    answer = asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+
+    assert answer["model_id"] == "primary"
+    assert "backup" not in calls
+    assert limiter.acquired == ["primary"]
+
+
+def test_hedge_takes_a_free_token(providers):
+    invoke, calls = providers({"primary": (1.0, 200), "backup": (0, 200)})
+    limiter = SlowLimiter()
+    router = LLMRouter(invoke, hedge=True, hedge_min_delay_ms=100, limiter=limiter)
+    router.stats_for("primary").p95_ms = lambda: 100.0
+
+    answer = asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+
+    assert answer["model_id"] == "backup"
+    assert limiter.acquired == ["primary", "backup"]
+
+
+def test_no_hedge_without_a_free_token(providers):
+    invoke, calls = providers({"primary": (0.3, 200), "backup": (0, 200)})
+    limiter = SlowLimiter(free_token=False)
+    router = LLMRouter(invoke, hedge=True, hedge_min_delay_ms=100, limiter=limiter)
+    router.stats_for("primary").p95_ms = lambda: 100.0
+
+    answer = asyncio.run(router.complete("primary", PAYLOAD, ["backup"]))
+
+    assert answer["model_id"] == "primary"
+    assert "backup" not in calls
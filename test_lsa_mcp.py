@@ -0,0 +1,168 @@
+"""
+MCP connection manager against local stub MCP servers
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.blob_codec import dumps_json
+from app.services import lsa_mcp
+from app.services.lsa_mcp import MCPConnectionManager, MCPError
+
+TOOLS = [
+    {"name": "claims_lookup", "description": "Look up a claim", "inputSchema": {"type": "object"}},
+    {"name": "member_search", "description": "Search members", "inputSchema": {"type": "object"}},
+]
+
+
+def make_handler(calls, mode="json", delay=0.0):
+    """
+    Stub MCP server over streamable HTTP. mode: "json", "sse", "empty" (200 with no
+    body for requests) or "garbage" (invalid JSON).
+    """
+    class StubMCPHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body=b"", content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Mcp-Session-Id", "stub-session")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_DELETE(self):
+            self._reply(200)
+
+        def do_POST(self):
+            message = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            method = message["method"]
+            calls[method] = calls.get(method, 0) + 1
+            if "id" not in message:
+                return self._reply(202)
+            if mode == "empty":
+                return self._reply(200)
+            if mode == "garbage":
+                return self._reply(200, b"{not json")
+
+            time.sleep(delay)
+            if method == "tools/list":
+                # Two pages, one tool each
+                cursor = message["params"].get("cursor")
+                result = {"tools": TOOLS[1:]} if cursor else {"tools": TOOLS[:1], "nextCursor": "page-2"}
+            else:
+                result = {}
+            reply = {"jsonrpc": "2.0", "id": message["id"], "result": result}
+
+            if mode == "sse":
+                events = f"event: message\ndata: {json.dumps(reply)}\n\n".encode()
+                return self._reply(200, events, "text/event-stream")
+            self._reply(200, json.dumps(reply).encode())
+
+    return StubMCPHandler
+
+
+@pytest.fixture
+def mcp_server():
+    servers = []
+
+    def start(mode="json", delay=0.0):
+        calls = {}
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(calls, mode, delay))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/mcp", calls
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def manager():
+    manager = MCPConnectionManager(tools_ttl=60, health_check_seconds=0)
+    yield manager
+    manager.close()
+
+
+def mcp_rows(monkeypatch, urls):
+    rows = [
+        SimpleNamespace(id=i, mcp_tool_json=dumps_json({"name": f"server_{i}", "url": url}))
+        for i, url in enumerate(urls, start=1)
+    ]
+    monkeypatch.setattr(lsa_mcp.lsa_crud, "get_mcp_tools_by_agent", lambda db, agent_id: rows)
+
+
+@pytest.mark.parametrize("mode", ["json", "sse"])
+def test_list_tools_follows_pagination(mcp_server, manager, mode):
+    url, calls = mcp_server(mode)
+
+    assert [t["name"] for t in manager.list_tools(url)] == ["claims_lookup", "member_search"]
+    assert calls["initialize"] == 1
+    assert calls["notifications/initialized"] == 1
+    assert calls["tools/list"] == 2
+
+
+def test_tool_list_is_cached_and_session_reused(mcp_server, manager):
+    url, calls = mcp_server()
+
+    manager.list_tools(url)
+    manager.list_tools(url)
+    assert calls["tools/list"] == 2
+
+    manager.list_tools(url, refresh=True)
+    assert calls["initialize"] == 1
+    # Idle session was health-checked before reuse
+    assert calls["ping"] == 1
+
+
+def test_sessions_are_keyed_on_headers(mcp_server, manager):
+    url, calls = mcp_server()
+
+    manager.list_tools(url, {"Authorization": "Bearer a"})
+    manager.list_tools(url, {"Authorization": "Bearer b"})
+    assert calls["initialize"] == 2
+
+
+@pytest.mark.parametrize("mode", ["empty", "garbage"])
+def test_bad_reply_raises_mcp_error(mcp_server, manager, mode):
+    url, _ = mcp_server(mode)
+
+    with pytest.raises(MCPError):
+        manager.list_tools(url)
+
+
+def test_discovery_runs_in_parallel(mcp_server, manager, monkeypatch):
+    urls = [mcp_server(delay=0.2)[0] for _ in range(3)]
+    mcp_rows(monkeypatch, urls)
+
+    start = time.perf_counter()
+    discovered = manager.discover_agent_tools(None, "agent-1")
+    elapsed = time.perf_counter() - start
+
+    assert sorted(discovered) == [1, 2, 3]
+    assert all(len(d["tools"]) == 2 for d in discovered.values())
+    # initialize + two tools/list pages at 0.2s each per server, servers in parallel
+    assert elapsed < 3 * 0.6
+
+
+def test_bad_server_does_not_fail_discovery(mcp_server, manager, monkeypatch):
+    good, _ = mcp_server()
+    empty, _ = mcp_server("empty")
+    garbage, _ = mcp_server("garbage")
+    mcp_rows(monkeypatch, [good, empty, garbage, "http://127.0.0.1:1/mcp"])
+
+    discovered = manager.discover_agent_tools(None, "agent-1")
+
+    assert [t["name"] for t in discovered[1]["tools"]] == ["claims_lookup", "member_search"]
+    for tool_id in (2, 3, 4):
+        assert "tools" not in discovered[tool_id]
+        assert discovered[tool_id]["error"]
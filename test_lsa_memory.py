@@ -0,0 +1,55 @@
+"""
+Conversation memory compaction
+"""
+from app.services.lsa_memory import ConversationMemory, InMemoryCheckpointer, MemoryConfig, message_tokens
+
+
+def memory(**settings):
+    return ConversationMemory(MemoryConfig(**settings), InMemoryCheckpointer())
+
+
+def turn(i, size=10):
+    return [
+        {"role": "user", "content": f"question {i} " + "q" * size},
+        {"role": "assistant", "content": f"answer {i} " + "a" * size},
+    ]
+
+
+def test_window_keeps_recent_turns_and_summarizes_the_rest():
+    conversation = memory(window_messages=4, max_tokens=4000)
+    for i in range(4):
+        conversation.append("t", turn(i))
+
+    history = conversation.load("t")
+
+    assert [m["content"].split()[1] for m in history[1:]] == ["2", "2", "3", "3"]
+    assert history[0]["role"] == "system"
+    assert "question 0" in history[0]["content"]
+
+
+def test_oversized_latest_user_turn_is_kept_and_truncated():
+    conversation = memory(window_messages=20, max_tokens=200, summary_max_tokens=50)
+    conversation.append("t", turn(0))
+    conversation.append("t", [{"role": "user", "content": "latest " + "x" * 4000}])
+
+    messages = conversation._state("t")["messages"]
+
+    assert [m["role"] for m in messages] == ["user"]
+    assert messages[0]["content"].startswith("latest ")
+    assert messages[0]["content"].endswith("...[truncated]")
+    assert message_tokens(messages[0]) <= 200 - 50
+    assert "question 0" in conversation._state("t")["summary"]
+
+
+def test_latest_user_turn_keeps_its_tool_results():
+    conversation = memory(window_messages=2, max_tokens=4000)
+    conversation.append("t", turn(0))
+    conversation.append("t", [
+        {"role": "user", "content": "look it up"},
+        {"role": "assistant", "content": "", "tool_calls": [{"id": "c1"}]},
+        {"role": "tool", "tool_call_id": "c1", "content": "result"},
+    ])
+
+    messages = conversation._state("t")["messages"]
+
+    assert [m["role"] for m in messages] == ["user", "assistant", "tool"]
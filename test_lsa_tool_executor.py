@@ -0,0 +1,140 @@
+"""
+Parallel tool execution
+"""
+import asyncio
+import threading
+import time
+
+from app.services.lsa_tool_cache import ToolResultCache, tool_key
+from app.services.lsa_tool_executor import ToolExecutor
+
+
+def call(call_id, name, **args):
+    return {"id": call_id, "name": name, "args": args}
+
+
+def test_results_in_call_order_and_run_concurrently():
+    async def slow(query):
+        await asyncio.sleep(0.2)
+        return {"query": query}
+
+    def fast(query):
+        return f"found {query}"
+
+    executor = ToolExecutor({"slow": slow, "fast": fast})
+
+    start = time.perf_counter()
+    messages = asyncio.run(executor.run([call("1", "slow", query="a"), call("2", "fast", query="b"), call("3", "slow", query="c")]))
+
+    assert time.perf_counter() - start < 0.4
+    assert [m["tool_call_id"] for m in messages] == ["1", "2", "3"]
+    assert messages[1]["content"] == "found b"
+    assert all(m["status"] == "success" for m in messages)
+
+
+def test_errors_do_not_fail_the_turn():
+    def broken():
+        raise ValueError("bad input")
+
+    messages = asyncio.run(ToolExecutor({"broken": broken}).run([call("1", "broken"), call("2", "missing")]))
+
+    assert [m["status"] for m in messages] == ["error", "error"]
+    assert "bad input" in messages[0]["content"]
+    assert "Unknown tool" in messages[1]["content"]
+
+
+def test_timed_out_thread_keeps_its_slot_until_it_finishes():
+    finished = threading.Event()
+
+    def hung():
+        time.sleep(0.5)
+        finished.set()
+        return "late"
+
+    def quick():
+        return "ok"
+
+    executor = ToolExecutor({"hung": hung, "quick": quick}, max_concurrency=1, tool_timeouts={"hung": 0.1})
+
+    async def turns():
+        first = await executor.run([call("1", "hung")])
+        start = time.perf_counter()
+        second = await executor.run([call("2", "quick")])
+        return first, second, time.perf_counter() - start
+
+    first, second, waited = asyncio.run(turns())
+
+    assert "timed out" in first[0]["content"]
+    assert second[0]["content"] == "ok"
+    # The quick call only got the slot once the hung thread returned
+    assert finished.is_set()
+    assert waited >= 0.3
+
+
+def test_cached_tool_is_served_from_cache_until_ttl():
+    calls = []
+
+    def analyst(question, limit=None):
+        calls.append(question)
+        return {"rows": [question]}
+
+    executor = ToolExecutor(
+        {"analyst": analyst},
+        tool_cache={"analyst": {"enabled": True, "ttl_seconds": 0.2}},
+    )
+    first = asyncio.run(executor.run([{"id": "1", "name": "analyst", "args": {"question": "q", "limit": None}}]))
+    # Same call with reordered / unset args is the same key
+    second = asyncio.run(executor.run([{"id": "2", "name": "analyst", "args": {"question": "q"}}]))
+    assert calls == ["q"]
+    assert second[0]["cached"] is True
+    assert second[0]["content"] == first[0]["content"]
+    assert second[0]["tool_call_id"] == "2"
+
+    time.sleep(0.25)
+    asyncio.run(executor.run([{"id": "3", "name": "analyst", "args": {"question": "q"}}]))
+    assert calls == ["q", "q"]
+
+
+def test_errors_and_uncached_tools_are_not_cached():
+    calls = []
+
+    def flaky(x):
+        calls.append(x)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return x
+
+    executor = ToolExecutor(
+        {"flaky": flaky, "plain": lambda x: calls.append(x) or x},
+        tool_cache={"flaky": {"enabled": True}, "plain": {"enabled": False}},
+    )
+    for i in range(2):
+        asyncio.run(executor.run([{"id": str(i), "name": "flaky", "args": {"x": 1}}]))
+        asyncio.run(executor.run([{"id": str(i), "name": "plain", "args": {"x": 2}}]))
+    assert calls == [1, 2, 1, 2]
+    assert set(executor.cache_stats()) == {"flaky"}
+    result = asyncio.run(executor.run([{"id": "9", "name": "flaky", "args": {"x": 1}}]))
+    assert result[0]["cached"] is True and calls == [1, 2, 1, 2]
+
+
+def test_tool_cache_evicts_least_recently_used_entry():
+    cache = ToolResultCache(max_entries=2)
+    cache.put(tool_key("t", {"a": 1}), "one")
+    cache.put(tool_key("t", {"a": 2}), "two")
+    assert cache.get(tool_key("t", {"a": 1})) == "one"
+    cache.put(tool_key("t", {"a": 3}), "three")
+    assert cache.get(tool_key("t", {"a": 2})) is None
+    assert cache.get(tool_key("t", {"a": 1})) == "one"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_tool_cache_byte_cap():
+    cache = ToolResultCache(max_entries=10, max_bytes=10)
+    cache.put("big", "x" * 11)
+    assert cache.get("big") is None
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.put("c", "cccc")
+    assert cache.get("a") is None
+    assert cache.get("b") == "bbbb" and cache.get("c") == "cccc"
+    assert cache.stats()["bytes"] == 8
@@ -0,0 +1,51 @@
+"""
+Schema migrations and hot-query plans on a temporary SQLite database
+"""
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app.database.migrations import (
+    HOT_QUERIES,
+    LATEST_VERSION,
+    MIGRATIONS,
+    check_query_plans,
+    ensure_schema,
+    schema_is_current,
+    upgrade,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_applies_every_migration_once(engine):
+    assert not schema_is_current(engine)
+    assert upgrade(engine) == [version for version, _, _ in MIGRATIONS]
+    assert schema_is_current(engine)
+
+    assert upgrade(engine) == []
+    assert ensure_schema(engine) == []
+
+
+def test_upgrade_adds_indexes_and_columns(engine):
+    upgrade(engine)
+    inspector = inspect(engine)
+
+    indexes = {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+    assert {index_name for _, index_name in HOT_QUERIES.values()} <= indexes
+    for table in ("llm_provider", "llm_model"):
+        assert {"requests_per_minute", "burst"} <= {c["name"] for c in inspector.get_columns(table)}
+
+
+def test_hot_queries_use_their_indexes(engine):
+    upgrade(engine)
+
+    assert check_query_plans(engine) == []
+
+
+def test_ensure_schema_migrates_a_new_database(engine):
+    assert ensure_schema(engine) == list(range(1, LATEST_VERSION + 1))
@@ -0,0 +1,80 @@
+"""
+Two-tier cache shared through a SQLite file
+"""
+import sqlite3
+
+import pytest
+
+from app.utils.two_tier_cache import TwoTierCache
+
+
+class LockedConnection:
+    """
+    Stands in for a tier 2 connection whose database is locked by another worker
+    """
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "shared_cache.db")
+
+
+def counting_loader(value):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return value
+    return load, calls
+
+
+def test_second_worker_hits_shared_tier(path):
+    first, second = TwoTierCache(path), TwoTierCache(path)
+    load, calls = counting_loader({"models": ["a", "b"]})
+
+    assert first.get_or_load("catalog", "v1", load) == {"models": ["a", "b"]}
+    assert second.get_or_load("catalog", "v1", load) == {"models": ["a", "b"]}
+    assert second.get_or_load("catalog", "v1", load) == {"models": ["a", "b"]}
+    assert len(calls) == 1
+    assert second.stats()["shared_hits"] == 1
+    assert second.stats()["local_hits"] == 1
+
+
+def test_new_version_reloads(path):
+    first, second = TwoTierCache(path), TwoTierCache(path)
+    first.get_or_load("catalog", "v1", lambda: ["a"])
+
+    assert second.get_or_load("catalog", "v2", lambda: ["a", "b"]) == ["a", "b"]
+    assert first.get_or_load("catalog", "v2", lambda: ["stale"]) == ["a", "b"]
+
+
+def test_locked_shared_tier_is_a_miss(path):
+    cache = TwoTierCache(path)
+    cache._conn = LockedConnection()
+    load, calls = counting_loader([1, 2, 3])
+
+    assert cache.get_or_load("catalog", "v1", load) == [1, 2, 3]
+    # The value still lands in the in-process tier
+    assert cache.get_or_load("catalog", "v1", load) == [1, 2, 3]
+    assert len(calls) == 1
+    assert cache.stats()["shared_errors"] == 2
+
+
+def test_corrupt_shared_entry_is_a_miss(path):
+    cache = TwoTierCache(path)
+    cache._conn.execute(
+        "INSERT INTO shared_cache (key, version, value, expires_at) VALUES ('catalog', 'v1', x'7b6e6f74', 9e99)"
+    )
+
+    assert cache.get_or_load("catalog", "v1", lambda: ["fresh"]) == ["fresh"]
+    assert cache.stats()["shared_errors"] == 1
+
+
+def test_unopenable_shared_tier_falls_back_to_local(tmp_path):
+    cache = TwoTierCache(str(tmp_path / "missing" / "shared_cache.db"))
+
+    assert cache.get_or_load("catalog", "v1", lambda: ["a"]) == ["a"]
+    assert cache.get_or_load("catalog", "v1", lambda: ["b"]) == ["a"]
@@ -0,0 +1,186 @@
+"""
+Two-tier cache shared by all uvicorn/gunicorn workers on a host.
+
+Tier 1 is an in-process LRU; tier 2 is a SQLite file every worker opens (WAL mode).
+Each entry is stored with a version string derived from the database, e.g. the row's
+updated_at, and a read only counts as a hit when the caller's current version matches.
+A write in one worker changes the version, so every other worker misses and reloads
+on its next read without any explicit invalidation message. Errors from the SQLite
+tier (e.g. "database is locked") are logged and treated as a miss.
+
+    SHARED_CACHE_PATH         SQLite file for tier 2 ("" disables it)
+    SHARED_CACHE_TTL_SECONDS  upper bound on entry age in either tier
+    SHARED_CACHE_MAX_LOCAL    LRU size of tier 1
+"""
+import os
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from app.database.blob_codec import dumps_json, loads_json
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "/tmp/agent_builder_cache.db")
+SHARED_CACHE_TTL_SECONDS = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "600"))
+SHARED_CACHE_MAX_LOCAL = int(os.getenv("SHARED_CACHE_MAX_LOCAL", "2048"))
+PRUNE_EVERY_PUTS = 500
+
+
+class TwoTierCache:
+    """
+    Version-checked cache: get_or_load(key, version, loader)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = SHARED_CACHE_PATH,
+        ttl_seconds: float = SHARED_CACHE_TTL_SECONDS,
+        max_local: int = SHARED_CACHE_MAX_LOCAL
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_local = max(1, max_local)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+        self._conn = None
+        self._shared_lock = threading.Lock()
+        if path:
+            try:
+                self._conn = self._open(path)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache {path} unavailable, using the in-process tier only: {e}")
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        return conn
+
+    # -----------------------------------------------------------------
+    # Tiers
+    # -----------------------------------------------------------------
+    def _get_local(self, key: str, version: str):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] == version and entry[1] > time.time():
+                self._local.move_to_end(key)
+                return True, entry[2]
+            del self._local[key]
+            return False, None
+
+    def _put_local(self, key: str, version: str, value: Any, expires_at: float):
+        with self._lock:
+            self._local[key] = (version, expires_at, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def _get_shared(self, key: str, version: str):
+        if self._conn is None:
+            return False, None, 0.0
+        with self._shared_lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM shared_cache WHERE key = ? AND version = ? AND expires_at > ?",
+                (key, version, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None, 0.0
+        return True, loads_json(row[0]), row[1]
+
+    def _put_shared(self, key: str, version: str, value: Any, expires_at: float):
+        if self._conn is None:
+            return
+        with self._shared_lock:
+            self._conn.execute(
+                "INSERT INTO shared_cache (key, version, value, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET version = excluded.version, value = excluded.value, "
+                "expires_at = excluded.expires_at",
+                (key, version, dumps_json(value), expires_at)
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY_PUTS == 0:
+                self._conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),))
+
+    # -----------------------------------------------------------------
+    # Public API
+    # -----------------------------------------------------------------
+    def get_or_load(self, key: str, version: str, loader: Callable[[], Any]) -> Any:
+        """
+        Value for key at version, from tier 1, then tier 2, then loader().
+        loader must return JSON-serializable data.
+        """
+        hit, value = self._get_local(key, version)
+        if hit:
+            self.local_hits += 1
+            return value
+
+        try:
+            hit, value, expires_at = self._get_shared(key, version)
+        except (sqlite3.Error, ValueError) as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared cache read failed for {key}, loading instead: {e}")
+            hit = False
+        if hit:
+            self.shared_hits += 1
+            self._put_local(key, version, value, expires_at)
+            return value
+
+        self.misses += 1
+        value = loader()
+        expires_at = time.time() + self.ttl_seconds
+        try:
+            self._put_shared(key, version, value, expires_at)
+        except sqlite3.Error as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+        self._put_local(key, version, value, expires_at)
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._local.pop(key, None)
+        if self._conn is not None:
+            with self._shared_lock:
+                self._conn.execute("DELETE FROM shared_cache WHERE key = ?", (key,))
+
+    def stats(self) -> dict:
+        total = self.local_hits + self.shared_hits + self.misses
+        return {
+            "local_entries": len(self._local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared_errors": self.shared_errors,
+            "hit_rate": round((self.local_hits + self.shared_hits) / total, 4) if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> TwoTierCache:
+    """
+    Process-wide cache, opened on first use
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TwoTierCache()
+        return _cache
@@ -0,0 +1,70 @@
+"""
+Streaming ZIP writer
+Builds a ZIP archive on the fly and yields it in chunks, reading source files
+incrementally so memory use does not grow with the size of the archive.
+"""
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkBuffer:
+    """
+    Write-only, non-seekable sink that hands written bytes back to the generator
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_folder(folder: str, prefix: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (arcname, path) for every file under folder, with arcnames rooted at prefix
+    """
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.join(prefix, os.path.relpath(path, folder)), path
+
+
+def stream_zip(entries: Iterable[Tuple[str, Union[str, bytes]]]) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of entries as it is written.
+    Each entry is (arcname, source) where source is a file path or in-memory bytes.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                archive.writestr(arcname, source)
+            else:
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(source, "rb") as src, archive.open(info, "w", force_zip64=True) as dst:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()